@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import CustomUser, Address
+from .models import CustomUser, Address, DailyStat
 
 
 # ---------------------------
@@ -32,7 +32,10 @@ class CustomUserAdmin(BaseUserAdmin):
         (None, {"fields": ("email", "password")}),
         (_("Personal info"), {"fields": ("full_name",)}),
         (_("Permissions"), {"fields": ("is_active", "is_staff", "is_superuser", "groups", "user_permissions")}),
-        (_("Important dates"), {"fields": ("last_login", "date_joined")}),
+        (_("Important dates"), {
+            "fields": ("last_login", "date_joined"),
+            "description": _("Last login is written in batches and may lag by up to a minute."),
+        }),
     )
 
     add_fieldsets = (
@@ -53,3 +56,24 @@ class AddressAdmin(admin.ModelAdmin):
     search_fields = ("user__email", "full_name", "line1", "city", "postal_code")
     ordering = ("-is_default", "-created_at")
     readonly_fields = ["created_at", "updated_at"]
+
+
+# ---------------------------
+# Daily Stats Admin
+# ---------------------------
+@admin.register(DailyStat)
+class DailyStatAdmin(admin.ModelAdmin):
+    """Read-only view of the dashboard rollups; written by ``rollup_stats``."""
+    list_display = ("day", "country", "signups", "addresses")
+    list_filter = ("country",)
+    date_hierarchy = "day"
+    ordering = ("-day", "country")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
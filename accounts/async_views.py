@@ -0,0 +1,215 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import Http404
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import Address
+from .serializers import (
+    UserProfileSerializer,
+    PasswordResetRequestSerializer,
+    AddressSerializer,
+    AsyncAddressSerializer,
+)
+from .throttling import IPTokenBucketThrottle, EmailTokenBucketThrottle
+from .idempotency import AsyncIdempotentPostMixin
+from .views import send_password_reset_email
+
+User = get_user_model()
+
+
+# ---------------------------
+# Async JWT Authentication
+# ---------------------------
+class AsyncJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication whose user lookup runs on the async ORM"""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        try:
+            user = await self.user_model.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code="user_not_found") from e
+
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+
+        return user
+
+
+# ---------------------------
+# Async API View
+# ---------------------------
+class AsyncAPIView(APIView):
+    """
+    APIView with an async ``dispatch`` for ``async def`` handlers.
+
+    Authentication is awaited first. DRF's regular ``initial()``
+    (permissions, throttles, negotiation) runs afterwards in a worker thread,
+    since throttles read and write the cache synchronously.
+    """
+    authentication_classes = [AsyncJWTAuthentication]
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.perform_async_authentication(request)
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def perform_async_authentication(self, request):
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except Exception:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+
+# ---------------------------
+# Profile (Get & Update)
+# ---------------------------
+class AsyncProfileView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request):
+        serializer = UserProfileSerializer(request.user, context={"request": request})
+        return Response(serializer.data)
+
+    async def put(self, request):
+        serializer = UserProfileSerializer(request.user, data=request.data, partial=True, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+        for attr, value in serializer.validated_data.items():
+            setattr(request.user, attr, value)
+        await request.user.asave(update_fields=list(serializer.validated_data))
+        return Response(serializer.data)
+
+
+# ---------------------------
+# Password Reset Request
+# ---------------------------
+class AsyncPasswordResetRequestView(AsyncAPIView):
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "password_reset"
+
+    async def post(self, request):
+        serializer = PasswordResetRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        email = serializer.validated_data["email"]
+        user = await User.objects.filter(email=email).afirst()
+        if user:
+            # Blocking SMTP I/O goes to the thread pool, off the event loop
+            await sync_to_async(send_password_reset_email, thread_sensitive=False)(user)
+        return Response({"detail": "If the email exists, a reset link has been sent."}, status=status.HTTP_200_OK)
+
+
+# ---------------------------
+# Address CRUD
+# ---------------------------
+class AsyncAddressListCreateView(AsyncIdempotentPostMixin, AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request):
+        queryset = AddressSerializer(context={"request": request}).narrow_queryset(
+            Address.objects.filter(user=request.user)
+        )
+        addresses = [address async for address in queryset]
+        serializer = AddressSerializer(addresses, many=True, context={"request": request})
+        return Response(serializer.data)
+
+    async def create(self, request):
+        serializer = AsyncAddressSerializer(data=request.data, context={"request": request})
+        await serializer.ais_valid(raise_exception=True)
+        await serializer.asave()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class AsyncAddressRetrieveUpdateDeleteView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get_object(self, request, pk, queryset=None):
+        queryset = Address.objects.all() if queryset is None else queryset
+        try:
+            return await queryset.aget(pk=pk, user=request.user)
+        except Address.DoesNotExist:
+            raise Http404
+
+    async def get(self, request, pk):
+        serializer = AddressSerializer(context={"request": request})
+        address = await self.get_object(request, pk, serializer.narrow_queryset(Address.objects.all()))
+        return Response(AddressSerializer(address, context={"request": request}).data)
+
+    async def put(self, request, pk):
+        return await self.update(request, pk, partial=False)
+
+    async def patch(self, request, pk):
+        return await self.update(request, pk, partial=True)
+
+    async def update(self, request, pk, partial):
+        address = await self.get_object(request, pk)
+        serializer = AsyncAddressSerializer(address, data=request.data, partial=partial, context={"request": request})
+        await serializer.ais_valid(raise_exception=True)
+        await serializer.asave()
+        return Response(serializer.data)
+
+    async def delete(self, request, pk):
+        address = await self.get_object(request, pk)
+        await address.adelete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+GLOBAL_VERSION_KEY = "perms:version"
+
+
+def _user_version_key(user_pk):
+    return f"perms:version:{user_pk}"
+
+
+def bump_permissions_version(user_pk=None):
+    """
+    Invalidate cached permission sets for one user, or for everyone when
+    ``user_pk`` is None (e.g. a group's permissions changed).
+    """
+    key = GLOBAL_VERSION_KEY if user_pk is None else _user_version_key(user_pk)
+    # A timestamp rather than a counter, so an evicted version key never
+    # falls back to a value that an older cache entry was stored under.
+    cache.set(key, time.time_ns(), timeout=None)
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    ModelBackend that keeps each user's resolved permission set in the
+    shared cache instead of querying groups and user permissions on every
+    request. Entries are keyed by a global and a per-user version that the
+    ``m2m_changed`` receivers in ``accounts.signals`` bump.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, "_perm_cache"):
+            user_obj._perm_cache = self._get_cached_permissions(user_obj)
+        return user_obj._perm_cache
+
+    def _get_cached_permissions(self, user_obj):
+        user_version_key = _user_version_key(user_obj.pk)
+        versions = cache.get_many([GLOBAL_VERSION_KEY, user_version_key])
+        key = "perms:{}:{}:{}:{}".format(
+            user_obj.pk,
+            int(user_obj.is_superuser),
+            versions.get(GLOBAL_VERSION_KEY, 0),
+            versions.get(user_version_key, 0),
+        )
+
+        perms = cache.get(key)
+        if perms is None:
+            perms = super().get_all_permissions(user_obj)
+            cache.set(key, perms, timeout=getattr(settings, "PERMISSION_CACHE_TIMEOUT", 300))
+        return perms
@@ -0,0 +1,226 @@
+"""
+Endpoint benchmark scenarios shared by ``manage.py bench`` and ``manage.py bench_asgi``.
+
+Each scenario is a function ``(ctx, i) -> (method, path, data)`` that prepares
+the i-th request; it runs outside the timed section, so per-iteration setup
+(fresh tokens, rows to delete, ...) never counts against the endpoint.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .exports import export_archive
+from .models import Address, CustomUser, DailyStat, DataExport
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+
+@contextmanager
+def benchmark_database():
+    """Run against a throwaway test database, never the configured one."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_bench_user(addresses):
+    """Create the benchmark user with ``addresses`` addresses; returns (user, access token)."""
+    user = CustomUser.objects.create_user(email=BENCH_EMAIL, password=BENCH_PASSWORD, full_name="Bench")
+    Address.objects.bulk_create(
+        Address(
+            user=user,
+            full_name="Bench",
+            phone_number="+254700000000",
+            line1=f"{i} Bench Road",
+            city="Nairobi",
+            postal_code="00100",
+            country="Kenya",
+            is_default=i == 0,
+        )
+        for i in range(addresses)
+    )
+    return user, str(RefreshToken.for_user(user).access_token)
+
+
+def seed_background_data(users, addresses_per_user):
+    """Bulk rows from other users, so queries run against realistic table sizes."""
+    if users:
+        call_command("seed_perf_data", users=users, addresses_per_user=addresses_per_user, stdout=StringIO())
+
+
+def _address_payload(line1):
+    return {
+        "full_name": "Bench",
+        "phone_number": "+254700000000",
+        "line1": line1,
+        "city": "Nairobi",
+        "postal_code": "00200",
+        "country": "Kenya",
+    }
+
+
+class BenchContext:
+    def __init__(self, user):
+        self.user = user
+        self.address = user.addresses.order_by("pk").first()
+        self.stats_seeded = False
+        self._export = None
+
+    @property
+    def export(self):
+        """A finished background export of the benchmark user, built on first use."""
+        if self._export is None:
+            self._export = DataExport.objects.create(
+                user=self.user, status=DataExport.Status.READY, finished_at=timezone.now()
+            )
+            self._export.archive.save(f"{self._export.pk}.zip", ContentFile(b"".join(export_archive(self.user))))
+        return self._export
+
+    def close(self):
+        # The database is thrown away, but archives live in EXPORT_ROOT
+        if self._export is not None:
+            self._export.archive.delete(save=False)
+
+
+# ---------------------------
+# Scenarios
+# ---------------------------
+def register(ctx, i):
+    email = f"bench-register-{i}@example.com"
+    return "post", reverse("register"), {
+        "email": email, "full_name": "Bench", "password": BENCH_PASSWORD, "confirm_password": BENCH_PASSWORD,
+    }
+
+
+def login(ctx, i):
+    return "post", reverse("login"), {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+
+
+def token_refresh(ctx, i):
+    return "post", reverse("token_refresh"), {"refresh": str(RefreshToken.for_user(ctx.user))}
+
+
+def profile_get(ctx, i):
+    return "get", reverse("profile"), None
+
+
+def profile_put(ctx, i):
+    return "put", reverse("profile"), {"full_name": f"Bench {i}"}
+
+
+def password_reset(ctx, i):
+    return "post", reverse("password_reset"), {"email": BENCH_EMAIL}
+
+
+def password_reset_confirm(ctx, i):
+    # The token depends on the current password hash, which the previous run changed
+    ctx.user.refresh_from_db()
+    return "post", reverse("password_reset_confirm"), {
+        "uidb64": urlsafe_base64_encode(force_bytes(ctx.user.pk)),
+        "token": default_token_generator.make_token(ctx.user),
+        "new_password": BENCH_PASSWORD,
+    }
+
+
+def addresses_list(ctx, i):
+    return "get", reverse("addresses_list_create"), None
+
+
+def addresses_create(ctx, i):
+    return "post", reverse("addresses_list_create"), _address_payload(f"{i} Create Street")
+
+
+def address_get(ctx, i):
+    return "get", reverse("address_detail", args=[ctx.address.pk]), None
+
+
+def address_update(ctx, i):
+    return "patch", reverse("address_detail", args=[ctx.address.pk]), {"city": f"Nairobi {i % 10}"}
+
+
+def address_delete(ctx, i):
+    address = Address.objects.create(user=ctx.user, **_address_payload(f"{i} Delete Street"))
+    return "delete", reverse("address_detail", args=[address.pk]), None
+
+
+def addresses_batch(ctx, i):
+    return "post", reverse("addresses_batch"), {
+        "create": [_address_payload(f"{i}-{n} Batch Street") for n in range(10)],
+    }
+
+
+def daily_stats(ctx, i):
+    if not ctx.stats_seeded:
+        # Staff-only endpoint; a year of rollups for two countries
+        CustomUser.objects.filter(pk=ctx.user.pk).update(is_staff=True)
+        today = timezone.localdate()
+        DailyStat.objects.bulk_create(
+            DailyStat(day=today - timedelta(days=n), country=country, signups=n % 7, addresses=n % 11)
+            for n in range(365) for country in ("", "Kenya")
+        )
+        ctx.stats_seeded = True
+    return "get", reverse("daily_stats") + f"?day__gte={timezone.localdate() - timedelta(days=30)}", None
+
+
+def data_export(ctx, i):
+    # Streamed inline for the benchmark user (up to EXPORT_INLINE_MAX_ADDRESSES)
+    return "get", reverse("data_export"), None
+
+
+def data_export_start(ctx, i):
+    # Starts a job once, then returns the one in progress
+    return "post", reverse("data_export"), None
+
+
+def data_export_detail(ctx, i):
+    return "get", reverse("data_export_detail", args=[ctx.export.pk]), None
+
+
+def data_export_download(ctx, i):
+    return "get", reverse("data_export_download", args=[ctx.export.pk]), None
+
+
+def health_check(ctx, i):
+    return "get", reverse("health-check"), None
+
+
+# name -> (prepare, authenticated, expected status, iteration cap)
+# Endpoints that hash a password are capped: PBKDF2 dominates and is not what regresses.
+SCENARIOS = {
+    "register": (register, False, 201, 10),
+    "login": (login, False, 200, 10),
+    "token_refresh": (token_refresh, False, 200, None),
+    "profile_get": (profile_get, True, 200, None),
+    "profile_put": (profile_put, True, 200, None),
+    "password_reset": (password_reset, False, 200, None),
+    "password_reset_confirm": (password_reset_confirm, False, 200, 10),
+    "addresses_list": (addresses_list, True, 200, None),
+    # Before the scenarios that add addresses, so it always exports the seeded ones
+    "data_export": (data_export, True, 200, None),
+    "data_export_start": (data_export_start, True, 202, None),
+    "data_export_detail": (data_export_detail, True, 200, None),
+    "data_export_download": (data_export_download, True, 200, None),
+    "addresses_create": (addresses_create, True, 201, None),
+    "address_get": (address_get, True, 200, None),
+    "address_update": (address_update, True, 200, None),
+    "address_delete": (address_delete, True, 204, None),
+    "addresses_batch": (addresses_batch, True, 200, None),
+    "daily_stats": (daily_stats, True, 200, None),
+    "health_check": (health_check, False, 200, None),
+}
@@ -0,0 +1,209 @@
+"""
+"Download my data" archives.
+
+``export_archive(user)`` generates a ZIP (profile, addresses and login
+metadata as JSON) piece by piece: zipfile writes to an unseekable sink, so
+local headers use data descriptors and nothing is ever rewound, and
+addresses are read in ``EXPORT_CHUNK_SIZE`` chunks. Memory stays constant
+whatever the number of rows and no temporary file is written. The same
+generator is streamed straight into the response for small exports and
+into the job's storage for large ones (``process_data_exports``).
+"""
+import io
+import json
+import logging
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Address, DataExport
+from .serializers import AddressSerializer, UserProfileSerializer
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT_VERSION = 1
+
+
+def export_filename(user):
+    return f"my-data-{user.pk}-{timezone.now():%Y%m%d}.zip"
+
+
+def export_archive(user):
+    """Yield the bytes of ``user``'s data export archive."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        _write_json(archive, "profile.json", UserProfileSerializer(user).data)
+        yield from sink.drain()
+
+        _write_json(archive, "login.json", {
+            "is_active": user.is_active,
+            "date_joined": user.date_joined,
+            # Written in batches by accounts.last_login, so it may lag slightly
+            "last_login": user.last_login,
+        })
+        yield from sink.drain()
+
+        with archive.open("addresses.json", "w") as member:
+            member.write(b"[")
+            addresses = Address.objects.filter(user=user).order_by("pk").iterator(
+                chunk_size=getattr(settings, "EXPORT_CHUNK_SIZE", 500)
+            )
+            # One serializer for all rows: building its fields is the costly part
+            serializer = AddressSerializer()
+            for index, address in enumerate(addresses):
+                if index:
+                    member.write(b",")
+                member.write(_dumps(serializer.to_representation(address)))
+                yield from sink.drain()
+            member.write(b"]")
+
+        _write_json(archive, "manifest.json", {
+            "format_version": ARCHIVE_FORMAT_VERSION,
+            "user": user.pk,
+            "generated_at": timezone.now(),
+            "files": ["profile.json", "login.json", "addresses.json"],
+        })
+    yield from sink.drain()
+
+
+def _dumps(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False).encode()
+
+
+def _write_json(archive, name, data):
+    with archive.open(name, "w") as member:
+        member.write(_dumps(data))
+
+
+class _Sink:
+    """Write-only, unseekable file for zipfile; ``drain()`` hands out what it got."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            yield data
+
+
+class _IteratorReader(io.RawIOBase):
+    """Readable file over an iterator of bytes, for Storage.save()."""
+
+    def __init__(self, iterator):
+        self._iterator = iterator
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._iterator)
+            except StopIteration:
+                return 0
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+# ---------------------------
+# Background jobs
+# ---------------------------
+def claim_export():
+    """
+    Mark the oldest pending export (or one whose worker died) as running and
+    return it, or None. Row locks keep concurrent workers apart. Each claim
+    counts as an attempt; a job whose worker died ``EXPORT_JOB_MAX_ATTEMPTS``
+    times is marked failed instead of being picked up again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, "EXPORT_JOB_TIMEOUT", 60 * 60))
+    DataExport.objects.filter(
+        status=DataExport.Status.RUNNING,
+        started_at__lt=stale,
+        attempts__gte=getattr(settings, "EXPORT_JOB_MAX_ATTEMPTS", 3),
+    ).update(status=DataExport.Status.FAILED, finished_at=now)
+
+    with transaction.atomic():
+        job = (
+            DataExport.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(
+                Q(status=DataExport.Status.PENDING)
+                | Q(status=DataExport.Status.RUNNING, started_at__lt=stale)
+            )
+            .order_by("created_at")
+            .select_related("user")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = DataExport.Status.RUNNING
+        # Also the claim token: build_export only finishes the job it claimed
+        job.started_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=["status", "started_at", "attempts"])
+    return job
+
+
+def build_export(job):
+    """
+    Stream ``job``'s archive into storage and mark it ready (or failed).
+
+    The job is only finished if it still carries this worker's claim: a
+    worker that outlived ``EXPORT_JOB_TIMEOUT`` and was superseded throws
+    its archive away instead of overwriting the newer claim's result.
+    """
+    try:
+        name = job.archive.field.generate_filename(job, f"{job.pk}.zip")
+        job.archive.name = job.archive.storage.save(
+            name, File(_IteratorReader(export_archive(job.user)), name=name)
+        )
+    except Exception:
+        logger.exception("Data export failed", extra={"export": str(job.pk)})
+        job.status = DataExport.Status.FAILED
+    else:
+        job.status = DataExport.Status.READY
+    job.finished_at = timezone.now()
+
+    finished = DataExport.objects.filter(
+        pk=job.pk, status=DataExport.Status.RUNNING, started_at=job.started_at
+    ).update(archive=job.archive.name or "", status=job.status, finished_at=job.finished_at)
+    if not finished:
+        logger.warning("Data export was claimed by another worker", extra={"export": str(job.pk)})
+        if job.archive:
+            job.archive.delete(save=False)
+        job.refresh_from_db()
+    return job
+
+
+def delete_expired_exports():
+    """Delete finished exports older than ``EXPORT_ARCHIVE_TTL`` and their files."""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, "EXPORT_ARCHIVE_TTL", 60 * 60 * 24))
+    expired = DataExport.objects.filter(
+        status__in=[DataExport.Status.READY, DataExport.Status.FAILED],
+        finished_at__lt=cutoff,
+    )
+    count = 0
+    for job in expired.iterator():
+        if job.archive:
+            job.archive.delete(save=False)
+        job.delete()
+        count += 1
+    return count
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+
+class IdempotentPostMixin:
+    """
+    Honor the ``Idempotency-Key`` header on POST.
+
+    The first response (status plus JSON body) is cached for
+    ``IDEMPOTENCY_KEY_TTL`` seconds and replayed on retries with the same key,
+    so a retry never re-runs password hashing or DB writes. A retry that
+    arrives while the first request is still running waits for its result.
+    5xx responses are not stored, so the client can retry them for real.
+
+    Views whose responses carry secrets (e.g. tokens) override
+    ``idempotency_data()`` to drop them before caching and
+    ``replay_data()`` to restore them on replay.
+    """
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().post(request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return self._invalid_key()
+
+        cache_key, lock_key, fingerprint = self._keys(request, key)
+        lock_timeout = getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 30)
+        deadline = time.monotonic() + lock_timeout
+
+        while True:
+            record = cache.get(cache_key)
+            if record is not None:
+                return self._replay(record, fingerprint)
+
+            if cache.add(lock_key, fingerprint, timeout=lock_timeout):
+                try:
+                    response = self._run(request, *args, **kwargs)
+                    if response.status_code < 500:
+                        cache.set(cache_key, self._record(response, fingerprint), timeout=self._ttl())
+                    return response
+                finally:
+                    cache.delete(lock_key)
+
+            # Another worker holds the key: wait for its response
+            if time.monotonic() >= deadline:
+                return self._in_progress()
+            time.sleep(POLL_INTERVAL)
+
+    def _run(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except Exception as exc:
+            # Turn handled API errors (e.g. validation) into a storable response;
+            # anything unhandled is re-raised by DRF and never cached.
+            return self.handle_exception(exc)
+
+    def _keys(self, request, key):
+        scope = request.user.pk if request.user.is_authenticated else "anon"
+        cache_key = f"idempotency:{self.__class__.__name__}:{scope}:{key}"
+        fingerprint = salted_hmac(
+            "accounts.idempotency",
+            json.dumps(request.data, cls=JSONEncoder, sort_keys=True),
+        ).hexdigest()
+        return cache_key, f"{cache_key}:lock", fingerprint
+
+    def _ttl(self):
+        return getattr(settings, "IDEMPOTENCY_KEY_TTL", 60 * 60 * 24)
+
+    def idempotency_data(self, response):
+        """The part of ``response.data`` to cache for replays."""
+        return response.data
+
+    def replay_data(self, status_code, data):
+        """The body to replay from cached ``idempotency_data()``."""
+        return data
+
+    def _record(self, response, fingerprint):
+        return {
+            "fingerprint": fingerprint,
+            "status": response.status_code,
+            "body": json.dumps(self.idempotency_data(response), cls=JSONEncoder),
+        }
+
+    def _replay(self, record, fingerprint):
+        if record["fingerprint"] != fingerprint:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} was already used with a different request body."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        data = self.replay_data(record["status"], json.loads(record["body"]))
+        response = Response(data, status=record["status"])
+        response[REPLAY_HEADER] = "true"
+        return response
+
+    def _invalid_key(self):
+        return Response(
+            {"detail": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def _in_progress(self):
+        return Response(
+            {"detail": "A request with this idempotency key is still in progress."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+
+class AsyncIdempotentPostMixin(IdempotentPostMixin):
+    """
+    ``IdempotentPostMixin`` for ``AsyncAPIView``: same records, async cache
+    calls. The view implements ``async def create`` instead of ``post``.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return await self.create(request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return self._invalid_key()
+
+        cache_key, lock_key, fingerprint = self._keys(request, key)
+        lock_timeout = getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 30)
+        deadline = time.monotonic() + lock_timeout
+
+        while True:
+            record = await cache.aget(cache_key)
+            if record is not None:
+                return self._replay(record, fingerprint)
+
+            if await cache.aadd(lock_key, fingerprint, timeout=lock_timeout):
+                try:
+                    response = await self._arun(request, *args, **kwargs)
+                    if response.status_code < 500:
+                        await cache.aset(cache_key, self._record(response, fingerprint), timeout=self._ttl())
+                    return response
+                finally:
+                    await cache.adelete(lock_key)
+
+            if time.monotonic() >= deadline:
+                return self._in_progress()
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _arun(self, request, *args, **kwargs):
+        try:
+            return await self.create(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
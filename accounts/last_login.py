@@ -0,0 +1,103 @@
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+    Write-behind buffer for ``last_login``.
+
+    Logins only record ``user_pk -> timestamp`` in memory; repeated logins by
+    the same user coalesce into one entry. A per-process background thread
+    writes the buffer with a single ``bulk_update`` every ``interval`` seconds
+    (sooner once ``max_pending`` users are waiting), so ``last_login`` is at
+    most about ``interval`` seconds stale.
+    """
+
+    def __init__(self, interval, max_pending, autostart=True):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.autostart = autostart
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def record(self, user_pk, when=None):
+        with self._lock:
+            self._pending[user_pk] = when or timezone.now()
+            full = len(self._pending) >= self.max_pending
+        if self.autostart:
+            self._ensure_worker()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write all pending timestamps; returns the number of users updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        User = get_user_model()
+        users = [User(pk=pk, last_login=when) for pk, when in pending.items()]
+        try:
+            User.objects.bulk_update(users, ["last_login"], batch_size=500)
+        except Exception:
+            # Put entries back for the next flush unless a newer login replaced them
+            with self._lock:
+                for pk, when in pending.items():
+                    self._pending.setdefault(pk, when)
+            raise
+        return len(users)
+
+    def _ensure_worker(self):
+        # Checked per process: a thread started before a fork does not run in the child
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="last-login-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush buffered last_login updates")
+            finally:
+                connection.close()
+
+
+last_login_buffer = LastLoginBuffer(
+    interval=getattr(settings, "LAST_LOGIN_FLUSH_INTERVAL", 30),
+    max_pending=getattr(settings, "LAST_LOGIN_BUFFER_SIZE", 1000),
+    autostart=getattr(settings, "LAST_LOGIN_FLUSH_AUTOSTART", True),
+)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        last_login_buffer.flush()
+    except Exception:
+        logger.exception("Failed to flush buffered last_login updates on exit")
+
+
+def record_login(sender, user, **kwargs):
+    """``user_logged_in`` receiver replacing Django's synchronous update_last_login"""
+    last_login_buffer.record(user.pk)
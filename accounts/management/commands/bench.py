@@ -0,0 +1,184 @@
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.bench import (
+    SCENARIOS,
+    BenchContext,
+    benchmark_database,
+    seed_background_data,
+    seed_bench_user,
+)
+from accounts.last_login import last_login_buffer
+
+DEFAULT_BUDGETS = Path(settings.BASE_DIR) / "bench_budgets.json"
+
+# Headroom applied by --write-budgets; query counts are exact. The floor keeps
+# millisecond-scale endpoints from failing on scheduler noise.
+LATENCY_HEADROOM = 3
+LATENCY_FLOOR_MS = 25
+ALLOC_HEADROOM = 2
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every accounts endpoint and the health check in-process against seeded data. "
+        "Records p50/p99 latency, queries and allocated bytes per request, writes JSON results "
+        "and fails if a committed budget is exceeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=30, help="Timed requests per endpoint.")
+        parser.add_argument("--only", help="Comma-separated scenario names to run.")
+        parser.add_argument("--seed-users", type=int, default=1000, help="Background users to seed.")
+        parser.add_argument("--addresses", type=int, default=20, help="Addresses of the benchmark user.")
+        parser.add_argument("--output", default="bench-results.json", help="Where to write JSON results.")
+        parser.add_argument("--budgets", default=str(DEFAULT_BUDGETS), help="Budget file to check against.")
+        parser.add_argument(
+            "--write-budgets", action="store_true",
+            help="Write budgets from this run (with headroom) instead of checking them.",
+        )
+
+    def handle(self, *args, iterations, only, seed_users, addresses, output, budgets, write_budgets, **options):
+        names = list(SCENARIOS)
+        if only:
+            names = [name.strip() for name in only.split(",")]
+            unknown = set(names) - set(SCENARIOS)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        no_throttling = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
+        with benchmark_database(), override_settings(
+            REST_FRAMEWORK=no_throttling,
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+        ):
+            seed_background_data(seed_users, addresses_per_user=2)
+            user, access = seed_bench_user(addresses)
+            ctx = BenchContext(user)
+            try:
+                results = {name: self._run(name, ctx, access, iterations) for name in names}
+            finally:
+                ctx.close()
+            last_login_buffer.flush()
+
+        Path(output).write_text(json.dumps(
+            {
+                "created_at": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "iterations": iterations,
+                "results": results,
+            },
+            indent=2,
+        ))
+        self._print(results)
+        self.stdout.write(f"Results written to {output}")
+
+        if write_budgets:
+            self._write_budgets(budgets, results)
+        else:
+            self._check_budgets(budgets, results)
+
+    def _run(self, name, ctx, access, iterations):
+        prepare, authenticated, expected_status, cap = SCENARIOS[name]
+        if cap:
+            iterations = min(iterations, cap)
+        client = APIClient()
+        if authenticated:
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        def call(i):
+            method, path, data = prepare(ctx, i)
+            start = time.perf_counter()
+            response = getattr(client, method)(path, data, format="json")
+            if response.streaming:
+                # Generating the body is the work being measured
+                content = b"".join(response.streaming_content)
+            else:
+                content = response.content
+            elapsed = time.perf_counter() - start
+            if response.status_code != expected_status:
+                raise CommandError(f"{name}: expected {expected_status}, got {response.status_code}: {content[:500]}")
+            return elapsed
+
+        # Warm-up, then timing, then a separate instrumented pass so that
+        # tracemalloc and query capture do not distort the latencies.
+        call(-1)
+        # As timeit does: a full collection of the seeded heap would land in
+        # one random request and dominate its scenario's p99
+        gc.collect()
+        gc.disable()
+        try:
+            latencies = sorted(call(i) for i in range(iterations))
+        finally:
+            gc.enable()
+
+        queries, allocations = [], []
+        for i in range(iterations, iterations + min(iterations, 5)):
+            tracemalloc.start()
+            try:
+                with CaptureQueriesContext(connection) as captured:
+                    call(i)
+                allocations.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+            queries.append(len(captured))
+
+        return {
+            "iterations": iterations,
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+            "queries": max(queries),
+            "alloc_kb": round(statistics.median(allocations) / 1024, 1),
+        }
+
+    def _print(self, results):
+        self.stdout.write(f"{'scenario':<24}{'p50 ms':>10}{'p99 ms':>10}{'queries':>9}{'alloc KB':>10}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<24}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{result['queries']:>9}{result['alloc_kb']:>10.1f}"
+            )
+
+    def _check_budgets(self, path, results):
+        try:
+            budgets = json.loads(Path(path).read_text())
+        except FileNotFoundError:
+            self.stdout.write(self.style.WARNING(f"No budget file at {path}; skipping budget check."))
+            return
+
+        failures = []
+        for name, result in results.items():
+            for metric, limit in budgets.get(name, {}).items():
+                if result[metric] > limit:
+                    failures.append(f"{name}.{metric} = {result[metric]} exceeds budget {limit}")
+
+        if failures:
+            raise CommandError("Performance budget exceeded:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All endpoints within budget."))
+
+    def _write_budgets(self, path, results):
+        budgets = {
+            name: {
+                "p99_ms": round(max(result["p99_ms"] * LATENCY_HEADROOM, LATENCY_FLOOR_MS), 1),
+                "queries": result["queries"],
+                "alloc_kb": round(result["alloc_kb"] * ALLOC_HEADROOM),
+            }
+            for name, result in results.items()
+        }
+        Path(path).write_text(json.dumps(budgets, indent=2) + "\n")
+        self.stdout.write(self.style.SUCCESS(f"Budgets written to {path}"))
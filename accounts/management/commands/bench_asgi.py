@@ -0,0 +1,122 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+
+from accounts.async_views import AsyncAddressListCreateView, AsyncProfileView
+from accounts.bench import benchmark_database, seed_bench_user
+from accounts.views import AddressListCreateView, ProfileView
+
+# Benchmark URLconf: sync and async variants side by side
+urlpatterns = [
+    path("sync/profile/", ProfileView.as_view()),
+    path("sync/addresses/", AddressListCreateView.as_view()),
+    path("async/profile/", AsyncProfileView.as_view()),
+    path("async/addresses/", AsyncAddressListCreateView.as_view()),
+]
+
+ENDPOINTS = ("profile", "addresses")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare in-process WSGI and ASGI throughput for the profile and address endpoints "
+        "at high concurrency, against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per run.")
+        parser.add_argument("--concurrency", type=int, default=100, help="Requests in flight.")
+        parser.add_argument("--addresses", type=int, default=10, help="Addresses seeded for the user.")
+        parser.add_argument("--endpoint", choices=ENDPOINTS, default="profile")
+
+    def handle(self, *args, requests, concurrency, addresses, endpoint, **options):
+        if concurrency < 1 or requests < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+
+        with benchmark_database(), override_settings(ROOT_URLCONF=__name__):
+            _, access = seed_bench_user(addresses)
+            headers = {"Authorization": f"Bearer {access}"}
+            runs = [
+                ("WSGI, sync view", self._run_wsgi, f"/sync/{endpoint}/"),
+                ("ASGI, sync view", self._run_asgi, f"/sync/{endpoint}/"),
+                ("ASGI, async view", self._run_asgi, f"/async/{endpoint}/"),
+            ]
+            self.stdout.write(f"{requests} requests to {endpoint}, concurrency {concurrency}")
+            for label, runner, url in runs:
+                elapsed, latencies = runner(url, headers, requests, concurrency)
+                self._report(label, elapsed, latencies)
+
+    def _run_wsgi(self, url, headers, requests, concurrency):
+        # One thread per in-flight request, like a threaded WSGI worker
+        pending = iter(range(requests))
+        lock = threading.Lock()
+        latencies = []
+        failures = []
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        if next(pending, None) is None:
+                            return
+                    start = time.perf_counter()
+                    response = client.get(url, headers=headers)
+                    if response.status_code != 200:
+                        failures.append(response.status_code)
+                        return
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        if failures:
+            # Raised here: an exception in a worker thread would only be printed
+            self._fail(url, failures[0])
+        return elapsed, latencies
+
+    def _run_asgi(self, url, headers, requests, concurrency):
+        # A single event loop with `concurrency` requests in flight
+        async def main():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def call():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(url, headers=headers)
+                    if response.status_code != 200:
+                        self._fail(url, response.status_code)
+                    return time.perf_counter() - start
+
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*(call() for _ in range(requests)))
+            elapsed = time.perf_counter() - start
+            await sync_to_async(connections.close_all)()
+            return elapsed, latencies
+
+        return asyncio.run(main())
+
+    def _fail(self, url, status_code):
+        raise CommandError(f"GET {url} returned {status_code}, expected 200.")
+
+    def _report(self, label, elapsed, latencies):
+        latencies = sorted(latencies)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"  {label:<18} {len(latencies) / elapsed:8.1f} req/s   "
+            f"p50 {statistics.median(latencies) * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms"
+        )
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from accounts.models import Address
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge addresses of the same user that differ only in case, punctuation or whitespace. "
+        "Duplicates are found by grouping on the (user, fingerprint) index. Per group, the default "
+        "address (else the most recently updated one) is kept, takes a state from the others if it "
+        "has none, and the others are deleted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Duplicate groups merged per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Report duplicates without changing anything.")
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be >= 1.")
+
+        # Rows not fingerprinted yet (raw inserts) all share "" and must not be merged
+        groups = list(
+            Address.objects.exclude(fingerprint="")
+            .values_list("user_id", "fingerprint")
+            .annotate(copies=Count("pk"))
+            .filter(copies__gt=1)
+            .order_by("user_id", "fingerprint")
+        )
+        duplicates = sum(copies - 1 for _, _, copies in groups)
+
+        if dry_run:
+            self.stdout.write(f"{len(groups)} duplicate groups, {duplicates} addresses would be removed.")
+            return
+
+        removed = 0
+        for start in range(0, len(groups), batch_size):
+            keys = {(user_id, fingerprint) for user_id, fingerprint, _ in groups[start:start + batch_size]}
+            with transaction.atomic():
+                removed += self._merge(keys)
+
+        self.stdout.write(self.style.SUCCESS(f"Merged {len(groups)} duplicate groups, removed {removed} addresses."))
+
+    def _merge(self, keys):
+        rows = (
+            Address.objects.select_for_update()
+            .filter(user_id__in={user_id for user_id, _ in keys}, fingerprint__in={fp for _, fp in keys})
+            .order_by("-is_default", "-updated_at", "-pk")
+        )
+        grouped = {}
+        for address in rows:
+            key = (address.user_id, address.fingerprint)
+            if key in keys:
+                grouped.setdefault(key, []).append(address)
+
+        survivors, doomed = [], []
+        for keeper, *others in grouped.values():
+            if not others:
+                # Merged concurrently since the groups were listed
+                continue
+            # state is the only optional part not covered by the fingerprint
+            if not keeper.state:
+                keeper.state = next((other.state for other in others if other.state), None)
+                if keeper.state:
+                    survivors.append(keeper)
+            doomed.extend(other.pk for other in others)
+
+        Address.objects.filter(pk__in=doomed).delete()
+        if survivors:
+            Address.objects.bulk_update(survivors, ["state"])
+        return len(doomed)
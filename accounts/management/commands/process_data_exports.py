@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.exports import build_export, claim_export, delete_expired_exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Build pending \"download my data\" archives into export storage and delete expired ones. "
+        "Run it from cron, or keep it running with --loop; several workers can run side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new jobs instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, loop, interval, **options):
+        while True:
+            expired = delete_expired_exports()
+            if expired:
+                self.stdout.write(f"Deleted {expired} expired exports.")
+
+            while (job := claim_export()) is not None:
+                started = time.monotonic()
+                build_export(job)
+                self.stdout.write(f"Export {job.pk}: {job.status} in {time.monotonic() - started:.1f}s")
+
+            if not loop:
+                break
+            time.sleep(interval)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Delete revoked refresh tokens that have expired, in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per statement.")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches.")
+
+    def handle(self, *args, batch_size, sleep, **options):
+        now = timezone.now()
+        total = 0
+
+        while True:
+            pks = list(RevokedToken.objects.expired(now).values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            RevokedToken.objects.filter(pk__in=pks).delete()
+            total += len(pks)
+            if sleep:
+                time.sleep(sleep)
+
+        self.stdout.write(self.style.SUCCESS(f"Pruned {total} expired revoked tokens."))
@@ -0,0 +1,157 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import Address, CustomUser, address_fingerprint
+
+PERF_PASSWORD = "perf-password"
+
+FIRST_NAMES = [
+    "Amina", "Brian", "Chloe", "David", "Esther", "Faith", "George", "Hannah", "Ivan", "Joy",
+    "Kevin", "Lucy", "Mark", "Njeri", "Otieno", "Peter", "Grace", "Rose", "Samuel", "Wanjiru",
+]
+LAST_NAMES = [
+    "Achieng", "Baraka", "Cheruiyot", "Dlamini", "Evans", "Garcia", "Hassan", "Kamau", "Kariuki",
+    "Mutua", "Nguyen", "Odhiambo", "Okafor", "Patel", "Smith", "Wambui", "Wekesa", "Yusuf",
+]
+STREETS = [
+    "Moi Avenue", "Kenyatta Avenue", "Ngong Road", "Waiyaki Way", "Mombasa Road", "Thika Road",
+    "Main Street", "Market Road", "Station Road", "Church Road", "Park Lane", "Harbour Drive",
+]
+CITIES = [
+    # (city, state, postal code prefix, country)
+    ("Nairobi", "Nairobi County", "00", "Kenya"),
+    ("Mombasa", "Mombasa County", "80", "Kenya"),
+    ("Kisumu", "Kisumu County", "40", "Kenya"),
+    ("Nakuru", "Nakuru County", "20", "Kenya"),
+    ("Kampala", "Central Region", "256", "Uganda"),
+    ("Dar es Salaam", "Dar es Salaam Region", "11", "Tanzania"),
+    ("Kigali", "Kigali City", "250", "Rwanda"),
+    ("Lagos", "Lagos State", "100", "Nigeria"),
+    ("London", None, "SW1A", "United Kingdom"),
+    ("Austin", "Texas", "787", "United States"),
+]
+
+ADDRESS_COLUMNS = (
+    "user_id", "full_name", "phone_number", "line1", "line2", "city", "state",
+    "postal_code", "country", "is_default", "fingerprint", "created_at", "updated_at",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate deterministic CustomUser and Address rows for load and scale testing. "
+        f"Every generated user has the password '{PERF_PASSWORD}'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, required=True, help="Number of users to create.")
+        parser.add_argument("--addresses-per-user", type=int, default=2, help="Addresses per user.")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed; same seed, same data.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Users per batch (one transaction each).")
+        parser.add_argument(
+            "--offset", type=int, default=0,
+            help="Index of the first generated user, to append to an earlier run without email clashes.",
+        )
+
+    def handle(self, *args, users, addresses_per_user, seed, batch_size, offset, **options):
+        if users < 0 or addresses_per_user < 0 or batch_size < 1:
+            raise CommandError("--users and --addresses-per-user must be >= 0 and --batch-size >= 1.")
+
+        # Hash once: PBKDF2 per row would dominate the run time
+        password = make_password(PERF_PASSWORD)
+        now = timezone.now()
+        created_at = connection.ops.adapt_datetimefield_value(now)
+        started = time.monotonic()
+        created_users = created_addresses = 0
+
+        for batch_start in range(offset, offset + users, batch_size):
+            batch_end = min(batch_start + batch_size, offset + users)
+            # One generator per batch, derived from the seed, so any slice of a
+            # run can be reproduced with --offset.
+            rng = random.Random(f"{seed}:{batch_start}")
+
+            with transaction.atomic():
+                batch = CustomUser.objects.bulk_create(
+                    [self._build_user(rng, index, password, now) for index in range(batch_start, batch_end)],
+                    batch_size=batch_size,
+                )
+                addresses = [
+                    row
+                    for user in batch
+                    for row in self._build_addresses(rng, user, addresses_per_user, created_at)
+                ]
+                # Addresses need no pks back, so skip model instances and per-row
+                # SQL compilation and insert the raw rows directly.
+                self._insert_rows(Address, ADDRESS_COLUMNS, addresses)
+
+            created_users += len(batch)
+            created_addresses += len(addresses)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{created_users}/{users} users, {created_addresses} addresses "
+                f"({(created_users + created_addresses) / max(elapsed, 1e-6):,.0f} rows/s)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created_users} users and {created_addresses} addresses "
+            f"in {time.monotonic() - started:.1f}s."
+        ))
+
+    def _build_user(self, rng, index, password, now):
+        date_joined = now - timedelta(seconds=rng.randint(0, 2 * 365 * 24 * 3600))
+        logged_in = rng.random() < 0.8
+        return CustomUser(
+            email=f"perf-user-{index}@example.com",
+            full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            password=password,
+            is_active=rng.random() < 0.95,
+            date_joined=date_joined,
+            last_login=date_joined + (now - date_joined) * rng.random() if logged_in else None,
+        )
+
+    def _build_addresses(self, rng, user, count, created_at):
+        """Yield address rows in ADDRESS_COLUMNS order."""
+        for n in range(count):
+            city, state, postal_prefix, country = rng.choice(CITIES)
+            phone_number = f"+2547{rng.randint(0, 99999999):08d}"
+            # The house number is unique per user, so unique_address_per_user holds
+            line1 = f"{n + 1} {rng.choice(STREETS)}"
+            line2 = f"Apt {rng.randint(1, 300)}" if rng.random() < 0.3 else None
+            postal_code = f"{postal_prefix}{rng.randint(100, 999)}"
+            yield (
+                user.pk,
+                user.full_name,
+                phone_number,
+                line1,
+                line2,
+                city,
+                state,
+                postal_code,
+                country,
+                n == 0,
+                # Raw inserts bypass Address.save(), so compute it here
+                address_fingerprint(line1, line2, city, postal_code, country),
+                created_at,
+                created_at,
+            )
+
+    def _insert_rows(self, model, columns, rows):
+        quote = connection.ops.quote_name
+        sql = "INSERT INTO {} ({}) VALUES ".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(column) for column in columns),
+        )
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # psycopg2's executemany sends one statement per row
+                from psycopg2.extras import execute_values
+
+                execute_values(cursor.cursor, sql + "%s", rows, page_size=1000)
+            else:
+                cursor.executemany(sql + "({})".format(", ".join(["%s"] * len(columns))), rows)
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:09
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models, transaction
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Frozen copy of accounts.models.address_fingerprint as of this migration, so
+# later changes to the model code cannot change what this migration computes
+FINGERPRINT_FIELDS = ("line1", "line2", "city", "postal_code", "country")
+
+_PUNCTUATION = re.compile(r"[^\w]+")
+
+
+def _normalize(value):
+    value = unicodedata.normalize("NFKC", value or "").casefold()
+    return " ".join(_PUNCTUATION.sub(" ", value).split())
+
+
+def address_fingerprint(line1, line2, city, postal_code, country):
+    parts = [
+        _normalize(line1),
+        _normalize(line2),
+        _normalize(city),
+        _normalize(postal_code).replace(" ", ""),
+        _normalize(country),
+    ]
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    # Keyset pagination over pk, one short transaction per batch, so the
+    # table is never locked or loaded as a whole.
+    Address = apps.get_model("accounts", "Address")
+    db = schema_editor.connection.alias
+    last_pk = 0
+
+    while True:
+        with transaction.atomic(using=db):
+            batch = list(
+                Address.objects.using(db)
+                .filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", *FINGERPRINT_FIELDS)[:BACKFILL_BATCH_SIZE]
+            )
+            if not batch:
+                break
+            for address in batch:
+                address.fingerprint = address_fingerprint(*(getattr(address, field) for field in FINGERPRINT_FIELDS))
+            Address.objects.using(db).bulk_update(batch, ["fingerprint"])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Lets each backfill batch commit on its own
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0002_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='address',
+            name='fingerprint',
+            field=models.CharField(default='', editable=False, max_length=32),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        # Built after the backfill rather than maintained through it
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['user', 'fingerprint'], name='address_user_fingerprint_idx'),
+        ),
+    ]
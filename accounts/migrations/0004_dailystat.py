@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_address_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('source', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_pk', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('country', models.CharField(blank=True, default='', max_length=100)),
+                ('signups', models.PositiveIntegerField(default=0)),
+                ('addresses', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day', 'country'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'country'), name='unique_daily_stat')],
+            },
+        ),
+    ]
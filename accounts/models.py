@@ -1,5 +1,12 @@
+import hashlib
+import re
+import unicodedata
+import uuid
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
-from django.db import models, IntegrityError
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction, IntegrityError
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -66,6 +73,54 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
 # Address Model
 
+# Parts of an address that identify it, normalized into Address.fingerprint
+FINGERPRINT_FIELDS = ("line1", "line2", "city", "postal_code", "country")
+
+_PUNCTUATION = re.compile(r"[^\w]+")
+
+
+def _normalize(value):
+    value = unicodedata.normalize("NFKC", value or "").casefold()
+    return " ".join(_PUNCTUATION.sub(" ", value).split())
+
+
+def address_fingerprint(line1, line2, city, postal_code, country):
+    """
+    Hash of the address ignoring case, punctuation and whitespace, so that
+    "12 Moi Ave." and " 12 moi  ave" match. Spaces inside postal codes are
+    dropped too ("SW1A 1AA" == "sw1a1aa").
+    """
+    parts = [
+        _normalize(line1),
+        _normalize(line2),
+        _normalize(city),
+        _normalize(postal_code).replace(" ", ""),
+        _normalize(country),
+    ]
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest()
+
+
+class AddressQuerySet(models.QuerySet):
+    """
+    Keeps ``fingerprint`` current on the bulk paths, which skip ``save()``.
+    ``update()`` cannot compute it in SQL: don't use it for address parts.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.fingerprint = obj.compute_fingerprint()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if set(fields) & set(FINGERPRINT_FIELDS):
+            objs = list(objs)
+            for obj in objs:
+                obj.fingerprint = obj.compute_fingerprint()
+            fields = [*fields, "fingerprint"]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class Address(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="addresses")
     full_name = models.CharField(max_length=255)
@@ -77,10 +132,14 @@ class Address(models.Model):
     postal_code = models.CharField(max_length=20)
     country = models.CharField(max_length=100)
     is_default = models.BooleanField(default=False)
+    # Normalized hash of FINGERPRINT_FIELDS, see address_fingerprint()
+    fingerprint = models.CharField(max_length=32, editable=False, default="")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AddressQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = "Addresses"
         ordering = ["-is_default", "-created_at"]
@@ -90,10 +149,24 @@ class Address(models.Model):
                 name="unique_address_per_user",
             )
         ]
+        indexes = [
+            models.Index(fields=["user", "fingerprint"], name="address_user_fingerprint_idx"),
+        ]
 
     def __str__(self):
         return f"{self.full_name} - {self.line1}, {self.city}"
 
+    def compute_fingerprint(self):
+        return address_fingerprint(*(getattr(self, field) for field in FINGERPRINT_FIELDS))
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or set(update_fields) & set(FINGERPRINT_FIELDS):
+            self.fingerprint = self.compute_fingerprint()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "fingerprint"}
+        super().save(*args, **kwargs)
+
     def clean(self):
         if self.is_default:
             qs = Address.objects.filter(user=self.user, is_default=True)
@@ -101,3 +174,125 @@ class Address(models.Model):
                 qs = qs.exclude(pk=self.pk)
             if qs.exists():
                 raise ValidationError(_("User can have only one default address"))
+
+
+
+# Revoked Refresh Tokens
+
+class RevokedTokenManager(models.Manager):
+    def revoke(self, jti, expires_at):
+        """
+        Record ``jti`` as revoked. Returns False if it already was, which
+        means the token is being replayed.
+        """
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        return True
+
+    def expired(self, now=None):
+        return self.filter(expires_at__lt=now or timezone.now())
+
+
+class RevokedToken(models.Model):
+    """
+    Refresh token that can no longer be used, keyed by its ``jti``.
+
+    Only revoked tokens are stored, and each row is useless once the token
+    itself expires, so ``prune_expired_tokens`` keeps the table bounded.
+    """
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = RevokedTokenManager()
+
+    def __str__(self):
+        return self.jti
+
+
+
+# Dashboard Rollups
+
+class DailyStat(models.Model):
+    """
+    Signups and new addresses per day and country, maintained
+    incrementally by ``rollup_stats`` (see accounts.rollups) so dashboards
+    read a few rows instead of aggregating users and addresses.
+
+    Users have no country, so their counts are stored under ``country=""``.
+    Counts are events: purging a user later does not decrement them.
+    """
+    day = models.DateField()
+    country = models.CharField(max_length=100, blank=True, default="")
+    signups = models.PositiveIntegerField(default=0)
+    addresses = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-day", "country"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "country"], name="unique_daily_stat"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.country or '-'}"
+
+
+class RollupWatermark(models.Model):
+    """Highest primary key of ``source`` already counted in DailyStat."""
+    source = models.CharField(max_length=50, primary_key=True)
+    last_pk = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.last_pk}"
+
+
+
+# Personal Data Exports
+
+def export_storage():
+    # Outside MEDIA_ROOT: archives are only served to their owner through the API
+    return FileSystemStorage(location=settings.EXPORT_ROOT)
+
+
+class DataExport(models.Model):
+    """
+    "Download my data" archive built in the background for users with too
+    many rows to stream inline (see accounts.exports). Polled by its owner
+    and deleted, with its file, ``EXPORT_ARCHIVE_TTL`` after it is ready.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        RUNNING = "running", _("Running")
+        READY = "ready", _("Ready")
+        FAILED = "failed", _("Failed")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="data_exports")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    archive = models.FileField(storage=export_storage, upload_to="%Y/%m/%d/", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Times a worker claimed the job; it fails after EXPORT_JOB_MAX_ATTEMPTS
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="dataexport_status_created_idx"),
+        ]
+        constraints = [
+            # At most one job in progress per user
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(status__in=["pending", "running"]),
+                name="unique_active_data_export",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.status} {self.created_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from itertools import takewhile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Address, CustomUser, DailyStat, RollupWatermark
+
+# source -> (model, timestamp field, country field or None, DailyStat counters)
+SOURCES = {
+    "users": (
+        CustomUser,
+        "date_joined",
+        None,
+        {"signups": Count("pk")},
+    ),
+    "addresses": (
+        Address,
+        "created_at",
+        "country",
+        {"addresses": Count("pk")},
+    ),
+}
+
+
+def rollup_stats(batch_size=10000):
+    """
+    Add rows created since the last run to DailyStat.
+
+    Each source is read in primary key order from its watermark, one batch
+    per transaction: the batch is aggregated in the database, the counters
+    are incremented and the watermark advanced together, so a row is counted
+    exactly once even if a run is interrupted. Returns rows processed per
+    source.
+
+    Primary keys are allocated before commit, so a row can become visible
+    after rows with higher keys. The watermark therefore stops at the first
+    row younger than ``ROLLUP_SAFETY_LAG`` seconds, which must exceed the
+    longest transaction that creates users or addresses.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, "ROLLUP_SAFETY_LAG", 5 * 60))
+    return {source: _rollup_source(source, batch_size, cutoff) for source in SOURCES}
+
+
+def _rollup_source(source, batch_size, cutoff):
+    model, timestamp_field, country_field, counters = SOURCES[source]
+    processed = 0
+
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(source=source)
+            batch = list(
+                model._base_manager.filter(pk__gt=watermark.last_pk)
+                .order_by("pk")
+                .values_list("pk", timestamp_field)[:batch_size]
+            )
+            pks = [pk for pk, _ in takewhile(lambda row: row[1] < cutoff, batch)]
+            if not pks:
+                return processed
+
+            group_by = ["day", country_field] if country_field else ["day"]
+            rows = (
+                model._base_manager.filter(pk__gt=watermark.last_pk, pk__lte=pks[-1])
+                .annotate(day=TruncDate(timestamp_field))
+                .order_by()
+                .values(*group_by)
+                .annotate(**counters)
+            )
+            _increment(rows, country_field, counters)
+
+            watermark.last_pk = pks[-1]
+            watermark.save(update_fields=["last_pk", "updated_at"])
+            processed += len(pks)
+            if len(pks) < len(batch):
+                # Reached rows inside the safety lag
+                return processed
+
+
+def _increment(rows, country_field, counters):
+    keys = [(row, row["day"], (row[country_field] or "") if country_field else "") for row in rows]
+    # Make sure every (day, country) row exists, then bump it in place
+    DailyStat.objects.bulk_create(
+        [DailyStat(day=day, country=country) for _, day, country in keys],
+        ignore_conflicts=True,
+    )
+    for row, day, country in keys:
+        DailyStat.objects.filter(day=day, country=country).update(
+            **{name: F(name) + row[name] for name in counters}
+        )
+
+
+@transaction.atomic
+def rebuild_stats():
+    """Drop all rollups and watermarks; the next ``rollup_stats`` recounts everything."""
+    DailyStat.objects.all().delete()
+    RollupWatermark.objects.all().delete()
@@ -1,19 +1,85 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from .models import Address
+from django.urls import reverse
+from django.utils import timezone
+from .models import Address, DailyStat, DataExport, RevokedToken
+from .last_login import last_login_buffer
 
 User = get_user_model()
 
 
+def _to_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------------------
+# Sparse fieldsets
+# ---------------------------
+class SparseFieldsMixin:
+    """
+    Limit output to ``?fields=a,b`` or drop ``?omit=a,b`` (read from the
+    request in the serializer context). Only output is affected: unselected
+    fields are skipped in ``to_representation``, while input is validated
+    as usual. Unknown names are a 400.
+    """
+
+    @property
+    def _readable_fields(self):
+        selected = self._selected_fields()
+        for field in super()._readable_fields:
+            if selected is None or field.field_name in selected:
+                yield field
+
+    def _selected_fields(self):
+        if not hasattr(self, "_sparse_fields"):
+            self._sparse_fields = None
+            request = self.context.get("request")
+            params = getattr(request, "query_params", None) or getattr(request, "GET", {})
+            fields = _split_names(params.get("fields"))
+            omit = _split_names(params.get("omit"))
+            if fields or omit:
+                available = [field.field_name for field in super()._readable_fields]
+                unknown = (fields | omit) - set(available)
+                if unknown:
+                    raise serializers.ValidationError({
+                        "fields": f"Unknown field(s): {', '.join(sorted(unknown))}. "
+                                  f"Available: {', '.join(available)}."
+                    })
+                self._sparse_fields = (fields or set(available)) - omit
+        return self._sparse_fields
+
+    def narrow_queryset(self, queryset):
+        """``.only()`` the columns the selected fields are read from."""
+        selected = self._selected_fields()
+        if selected is None:
+            return queryset
+        columns = {field.name for field in queryset.model._meta.concrete_fields}
+        return queryset.only(*(
+            field.source for field in self._readable_fields if field.source in columns
+        ))
+
+
+def _split_names(value):
+    return {name.strip() for name in value.split(",") if name.strip()} if value else set()
+
+
 # ---------------------------
 # User Serializer
 # ---------------------------
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Basic serializer for reading user data"""
     class Meta:
         model = User
@@ -37,6 +103,9 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["email", "full_name", "password", "confirm_password"]
+        # validate_email checks uniqueness on the normalized address; the
+        # model-derived UniqueValidator would repeat the same query.
+        extra_kwargs = {"email": {"validators": []}}
 
     def validate_email(self, value):
         value = User.objects.normalize_email(value)
@@ -69,14 +138,36 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Customize JWT login to include user info in response"""
     def validate(self, attrs):
         data = super().validate(attrs)
-        data["user"] = UserSerializer(self.user).data
+        data["user"] = UserSerializer(self.user, context=self.context).data
+        last_login_buffer.record(self.user.pk)
         return data
 
 
+# ---------------------------
+# JWT Refresh Serializer
+# ---------------------------
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh with rotation: the submitted refresh token is revoked by ``jti``
+    and a new one is returned. A revoked token is rejected, which also stops
+    two concurrent refreshes with the same token from both succeeding.
+    """
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        jti = refresh[jwt_settings.JTI_CLAIM]
+        cache_key = f"revoked-jti:{jti}"
+
+        if cache.get(cache_key) or not RevokedToken.objects.revoke(jti, datetime_from_epoch(refresh["exp"])):
+            raise InvalidToken("Token has been revoked.")
+
+        cache.set(cache_key, True, timeout=max(1, int(refresh["exp"] - refresh.current_time.timestamp())))
+        return super().validate(attrs)
+
+
 # ---------------------------
 # User Profile Serializer
 # ---------------------------
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Read/update user profile"""
     class Meta:
         model = User
@@ -128,19 +219,73 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
         return user
 
 
+# ---------------------------
+# Address List Serializer
+# ---------------------------
+class AddressListSerializer(serializers.ListSerializer):
+    """
+    List mode for AddressSerializer.
+
+    Creates are written with a single ``bulk_create`` and updates with a
+    single ``bulk_update``. For updates, ``instance`` is the list of target
+    addresses and every item in ``data`` must carry its ``id``.
+    """
+
+    def _instance_map(self):
+        if not hasattr(self, "_instances_by_pk"):
+            self._instances_by_pk = {obj.pk: obj for obj in self.instance}
+        return self._instances_by_pk
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            pk = _to_pk(data.get("id")) if isinstance(data, dict) else None
+            self.child.instance = self._instance_map().get(pk)
+            if self.child.instance is None:
+                raise serializers.ValidationError({"id": "Address not found."})
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        user = self.context["request"].user
+        return Address.objects.bulk_create(
+            [Address(**{**attrs, "user": user}) for attrs in validated_data]
+        )
+
+    def update(self, instance, validated_data):
+        instances = self._instance_map()
+        now = timezone.now()
+        changed_fields = {"updated_at"}
+        objs = []
+
+        for item, attrs in zip(self.initial_data, validated_data):
+            obj = instances[_to_pk(item["id"])]
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+                changed_fields.add(attr)
+            obj.updated_at = now
+            objs.append(obj)
+
+        Address.objects.bulk_update(objs, sorted(changed_fields))
+        return objs
+
+
 # ---------------------------
 # Address Serializer
 # ---------------------------
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
-        fields = "__all__"
+        exclude = ["fingerprint"]
         read_only_fields = ["user", "created_at", "updated_at"]
+        list_serializer_class = AddressListSerializer
 
     def validate(self, data):
         """
         Ensure only one default address per user
         """
+        if isinstance(self.parent, serializers.ListSerializer):
+            # Batch writes resolve the default swap once for the whole batch
+            return data
+
         user = self.context["request"].user
         is_default = data.get("is_default", False)
 
@@ -164,3 +309,215 @@ class AddressSerializer(serializers.ModelSerializer):
             # Ensure only one default address
             Address.objects.filter(user=instance.user, is_default=True).exclude(pk=instance.pk).update(is_default=False)
         return super().update(instance, validated_data)
+
+
+# ---------------------------
+# Async Address Serializer
+# ---------------------------
+class AsyncAddressSerializer(AddressSerializer):
+    """
+    AddressSerializer for async views: the one-default check and the writes
+    use the async ORM (``ais_valid`` / ``asave``) instead of blocking queries.
+    """
+
+    def validate(self, data):
+        # Checked in ais_valid() without blocking the event loop
+        return data
+
+    async def ais_valid(self, *, raise_exception=False):
+        if not self.is_valid(raise_exception=raise_exception):
+            return False
+
+        if self.validated_data.get("is_default", False):
+            qs = Address.objects.filter(user=self.context["request"].user, is_default=True)
+            if self.instance:
+                qs = qs.exclude(pk=self.instance.pk)
+            if await qs.aexists():
+                self._validated_data = {}
+                self._errors = {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        serializers.ErrorDetail("Only one default address is allowed per user.", code="invalid")
+                    ]
+                }
+                if raise_exception:
+                    raise serializers.ValidationError(self.errors)
+                return False
+        return True
+
+    async def asave(self):
+        validated_data = self.validated_data
+        if self.instance is None:
+            self.instance = await Address.objects.acreate(user=self.context["request"].user, **validated_data)
+            return self.instance
+
+        if validated_data.get("is_default", False):
+            # Ensure only one default address
+            await Address.objects.filter(user=self.instance.user_id, is_default=True).exclude(
+                pk=self.instance.pk
+            ).aupdate(is_default=False)
+        for attr, value in validated_data.items():
+            setattr(self.instance, attr, value)
+        await self.instance.asave()
+        return self.instance
+
+
+# ---------------------------
+# Address Batch Serializer
+# ---------------------------
+class AddressBatchSerializer(serializers.Serializer):
+    """
+    Create, update and delete many addresses of the current user at once.
+
+    Errors are reported per item, aligned with the submitted lists. Must be
+    validated and saved inside a single transaction.
+    """
+    max_items = 500
+
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        user = self.context["request"].user
+        total = len(attrs["create"]) + len(attrs["update"]) + len(attrs["delete"])
+        if total == 0:
+            raise serializers.ValidationError("Batch is empty.")
+        if total > self.max_items:
+            raise serializers.ValidationError(f"Batch cannot contain more than {self.max_items} items.")
+
+        update_ids = [_to_pk(item.get("id")) for item in attrs["update"]]
+        all_ids = [pk for pk in update_ids + attrs["delete"] if pk is not None]
+        if len(all_ids) != len(set(all_ids)):
+            raise serializers.ValidationError("Each address can appear only once per batch.")
+
+        targets = Address.objects.select_for_update().filter(user=user, pk__in=all_ids).in_bulk()
+
+        errors = {}
+
+        delete_errors = [{} if pk in targets else "Address not found." for pk in attrs["delete"]]
+        if any(delete_errors):
+            errors["delete"] = delete_errors
+
+        self._creator = AddressSerializer(data=attrs["create"], many=True, context=self.context)
+        self._updater = AddressSerializer(
+            [targets[pk] for pk in update_ids if pk in targets],
+            data=attrs["update"],
+            many=True,
+            partial=True,
+            context=self.context,
+        )
+        create_errors = [{} for _ in attrs["create"]]
+        update_errors = [{} for _ in attrs["update"]]
+        if not self._creator.is_valid():
+            create_errors = self._creator.errors
+        if not self._updater.is_valid():
+            update_errors = self._updater.errors
+
+        self._check_items(user, attrs, targets, create_errors, update_errors)
+
+        if any(create_errors):
+            errors["create"] = create_errors
+        if any(update_errors):
+            errors["update"] = update_errors
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def _check_items(self, user, attrs, targets, create_errors, update_errors):
+        """
+        Enforce one default and ``unique_address_per_user`` across the batch
+        and the stored rows, with a single query.
+        """
+        items = []
+        # ``validated_data`` is empty for a list that failed field validation
+        for index, data in enumerate(self._creator.validated_data):
+            items.append((create_errors[index], data.get("is_default", False), data["line1"], data["postal_code"]))
+        for index, data in enumerate(self._updater.validated_data):
+            obj = targets[_to_pk(attrs["update"][index]["id"])]
+            items.append((
+                update_errors[index],
+                data.get("is_default", False),
+                data.get("line1", obj.line1),
+                data.get("postal_code", obj.postal_code),
+            ))
+
+        released = set(targets)
+        taken = set(
+            Address.objects.filter(user=user, line1__in={line1 for _, _, line1, _ in items})
+            .exclude(pk__in=released)
+            .values_list("line1", "postal_code")
+        )
+
+        seen = set()
+        has_default = False
+        for item_errors, is_default, line1, postal_code in items:
+            messages = []
+            if is_default:
+                if has_default:
+                    messages.append("Only one default address is allowed per user.")
+                has_default = True
+            key = (line1, postal_code)
+            if key in taken:
+                messages.append("An address with this line1 and postal code already exists.")
+            elif key in seen:
+                messages.append("Duplicate address in batch.")
+            seen.add(key)
+            if messages:
+                item_errors.setdefault(api_settings.NON_FIELD_ERRORS_KEY, []).extend(messages)
+
+    def save(self):
+        # ``create`` is taken by the field of the same name, so the batch
+        # writes live here rather than in ``create()``.
+        user = self.context["request"].user
+        validated_data = self.validated_data
+
+        if validated_data["delete"]:
+            Address.objects.filter(user=user, pk__in=validated_data["delete"]).delete()
+
+        updated, created = [], []
+        new_default = next(
+            (obj for obj, data in zip(self._updater.instance, self._updater.validated_data) if data.get("is_default")),
+            None,
+        )
+        if new_default is not None or any(data.get("is_default") for data in self._creator.validated_data):
+            # One swap for the whole batch instead of one per item
+            qs = Address.objects.filter(user=user, is_default=True)
+            if new_default is not None:
+                qs = qs.exclude(pk=new_default.pk)
+            qs.update(is_default=False)
+            for obj in self._updater.instance:
+                if obj is not new_default:
+                    obj.is_default = False
+
+        if self._updater.initial_data:
+            updated = self._updater.save()
+        if self._creator.initial_data:
+            created = self._creator.save()
+
+        return {"created": created, "updated": updated, "deleted": validated_data["delete"]}
+
+
+# ---------------------------
+# Daily Stats Serializer
+# ---------------------------
+class DailyStatSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyStat
+        fields = ["day", "country", "signups", "addresses"]
+
+
+# ---------------------------
+# Data Export Serializer
+# ---------------------------
+class DataExportSerializer(serializers.ModelSerializer):
+    poll_url = serializers.HyperlinkedIdentityField(view_name="data_export_detail")
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DataExport
+        fields = ["id", "status", "created_at", "finished_at", "poll_url", "download_url"]
+
+    def get_download_url(self, obj):
+        if obj.status != DataExport.Status.READY:
+            return None
+        return self.context["request"].build_absolute_uri(reverse("data_export_download", args=[obj.pk]))
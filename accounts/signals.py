@@ -0,0 +1,55 @@
+from django.contrib.auth.models import Group, Permission
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+
+from .backends import bump_permissions_version
+from .last_login import record_login
+from .models import CustomUser
+
+M2M_POST_ACTIONS = ("post_add", "post_remove", "post_clear")
+
+
+def _bump_on_commit(using, user_pk=None):
+    # Bumped inside the transaction, a concurrent request could cache the
+    # old permissions under the new version until PERMISSION_CACHE_TIMEOUT
+    transaction.on_commit(lambda: bump_permissions_version(user_pk), using=using)
+
+
+# ---------------------------
+# Permission cache invalidation
+# ---------------------------
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in M2M_POST_ACTIONS:
+        return
+    if not reverse:
+        _bump_on_commit(using, instance.pk)
+    elif pk_set:
+        # e.g. group.user_set.add(...): only the listed users changed
+        for user_pk in pk_set:
+            _bump_on_commit(using, user_pk)
+    else:
+        _bump_on_commit(using)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, action, using, **kwargs):
+    if action in M2M_POST_ACTIONS:
+        _bump_on_commit(using)
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_on_delete(sender, using, **kwargs):
+    _bump_on_commit(using)
+
+
+# ---------------------------
+# Buffered last_login
+# ---------------------------
+# Replace Django's one-UPDATE-per-login receiver with the write-behind buffer
+user_logged_in.disconnect(dispatch_uid="update_last_login")
+user_logged_in.connect(record_login, dispatch_uid="record_login")
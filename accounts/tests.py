@@ -1,9 +1,51 @@
-from django.test import TestCase
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from contextlib import contextmanager
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+import gzip
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+import zlib
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management import call_command
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, connection, transaction
+from django.http import StreamingHttpResponse
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core.compression import APICompressionMiddleware, brotli, negotiate
+from core.exception_handler import custom_exception_handler
+from core.logs import BackgroundHandler, ErrorRateLimitFilter, JsonFormatter
+from core.memory_profiling import MemoryProfileMiddleware, memory_profiles
+from core.slow_queries import slow_queries
 
-from .models import CustomUser, Address
+from .async_views import AsyncAddressListCreateView, AsyncProfileView
+from .last_login import LastLoginBuffer, last_login_buffer
+from .exports import build_export, claim_export
+from .management.commands.purge_inactive_users import Command as PurgeCommand
+from .models import CustomUser, Address, DailyStat, DataExport, RevokedToken, address_fingerprint
+from .throttling import IPTokenBucketThrottle, TokenBucket
+from .views import ProfileView
+from .warmup import warm_up
 
 
 class UserManagerTest(TestCase):
@@ -195,3 +237,1674 @@ class AddressModelTest(TestCase):
         )
 
         self.assertEqual(self.user.addresses.count(), 2)
+
+
+class AddressBatchAPITest(APITestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="batch@example.com",
+            password="password123",
+            full_name="Batch User",
+        )
+        self.client.force_authenticate(self.user)
+        self.url = reverse("addresses_batch")
+
+    def _address(self, line1, postal_code="00100", **extra):
+        return {
+            "full_name": "Batch User",
+            "phone_number": "+123456789",
+            "line1": line1,
+            "city": "Nairobi",
+            "postal_code": postal_code,
+            "country": "Kenya",
+            **extra,
+        }
+
+    def test_create_update_delete_in_one_request(self):
+        old_default = Address.objects.create(user=self.user, is_default=True, **self._address("1 Old Road"))
+        doomed = Address.objects.create(user=self.user, **self._address("2 Old Road"))
+
+        response = self.client.post(
+            self.url,
+            {
+                "create": [self._address("3 New Road", is_default=True), self._address("4 New Road")],
+                "update": [{"id": old_default.pk, "city": "Mombasa"}],
+                "delete": [doomed.pk],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["created"]), 2)
+        self.assertEqual(response.data["deleted"], [doomed.pk])
+        old_default.refresh_from_db()
+        self.assertEqual(old_default.city, "Mombasa")
+        self.assertFalse(old_default.is_default)
+        self.assertEqual(
+            list(self.user.addresses.filter(is_default=True).values_list("line1", flat=True)),
+            ["3 New Road"],
+        )
+        self.assertFalse(Address.objects.filter(pk=doomed.pk).exists())
+
+    def test_per_item_errors_roll_back_whole_batch(self):
+        Address.objects.create(user=self.user, **self._address("1 Taken Road"))
+
+        response = self.client.post(
+            self.url,
+            {
+                "create": [
+                    self._address("5 Fine Road"),
+                    self._address("1 Taken Road"),
+                    self._address("5 Fine Road"),
+                ],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.user.addresses.count(), 1)
+
+    def test_cannot_touch_other_users_addresses(self):
+        other = CustomUser.objects.create_user(
+            email="other@example.com",
+            password="password123",
+            full_name="Other User",
+        )
+        foreign = Address.objects.create(user=other, **self._address("9 Foreign Road"))
+
+        response = self.client.post(self.url, {"delete": [foreign.pk]}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Address.objects.filter(pk=foreign.pk).exists())
+
+
+class IdempotencyKeyTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("register")
+        self.payload = {
+            "email": "retry@example.com",
+            "full_name": "Retry User",
+            "password": "password123",
+            "confirm_password": "password123",
+        }
+
+    def test_retry_replays_first_response(self):
+        first = self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+        second = self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(second.json()["user"], first.json()["user"])
+        self.assertEqual(CustomUser.objects.filter(email="retry@example.com").count(), 1)
+
+    def test_register_replay_mints_tokens_instead_of_caching_them(self):
+        first = self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="abc-789")
+        second = self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="abc-789")
+
+        record = cache.get("idempotency:RegisterView:anon:abc-789")
+        self.assertEqual(json.loads(record["body"]), {"user": first.json()["user"]})
+        self.assertNotIn(first.json()["refresh"], record["body"])
+
+        self.assertEqual(second.status_code, 201)
+        user_id = first.json()["user"]["id"]
+        self.assertEqual(RefreshToken(second.json()["refresh"])["user_id"], str(user_id))
+        self.assertEqual(AccessToken(second.json()["access"])["user_id"], str(user_id))
+
+    def test_reused_key_with_different_body_is_rejected(self):
+        self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="abc-456")
+        response = self.client.post(
+            self.url,
+            {**self.payload, "email": "other@example.com"},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="abc-456",
+        )
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(CustomUser.objects.filter(email="other@example.com").exists())
+
+    def test_without_key_requests_are_not_deduplicated(self):
+        self.client.post(self.url, self.payload, format="json")
+        response = self.client.post(self.url, self.payload, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TokenBucketThrottleTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_password_reset_is_throttled_per_email(self):
+        url = reverse("password_reset")
+        for _ in range(3):
+            response = self.client.post(url, {"email": "Victim@Example.com"}, format="json")
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(url, {"email": " victim@example.com "}, format="json")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+        response = self.client.post(url, {"email": "someone-else@example.com"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_register_is_throttled_per_email_across_ips(self):
+        url = reverse("register")
+        payload = {"email": "Target@Example.com"}
+        for n in range(5):
+            response = self.client.post(url, payload, format="json", REMOTE_ADDR=f"203.0.113.{n}")
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(url, payload, format="json", REMOTE_ADDR="203.0.113.99")
+
+        self.assertEqual(response.status_code, 429)
+
+    def test_empty_bucket_reports_wait_until_refill(self):
+        bucket = TokenBucket(capacity=2, refill_rate=0.5)
+
+        self.assertEqual(bucket.consume("bucket-test"), 0)
+        self.assertEqual(bucket.consume("bucket-test"), 0)
+        self.assertAlmostEqual(bucket.consume("bucket-test"), 2, delta=0.1)
+
+    def test_rotating_forwarded_for_shares_one_ip_bucket(self):
+        url = reverse("register")
+        for n in range(10):
+            response = self.client.post(url, {}, format="json", HTTP_X_FORWARDED_FOR=f"203.0.113.{n}")
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(url, {}, format="json", HTTP_X_FORWARDED_FOR="203.0.113.99")
+
+        self.assertEqual(response.status_code, 429)
+
+    def test_only_trusted_proxy_hops_are_read(self):
+        rest_framework = {**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            throttle = IPTokenBucketThrottle()
+            request = RequestFactory().get("/", HTTP_X_FORWARDED_FOR="198.51.100.7, 192.0.2.10")
+
+            # The proxy appended the real client; the spoofed entry before it is ignored
+            self.assertEqual(throttle.get_ident_value(request), "192.0.2.10")
+
+
+class RefreshTokenRotationTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email="rotate@example.com",
+            password="password123",
+            full_name="Rotate User",
+        )
+        self.url = reverse("token_refresh")
+
+    def test_refresh_rotates_and_revokes_old_token(self):
+        old = str(RefreshToken.for_user(self.user))
+
+        response = self.client.post(self.url, {"refresh": old}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+        self.assertNotEqual(response.data["refresh"], old)
+
+        replay = self.client.post(self.url, {"refresh": old}, format="json")
+        self.assertEqual(replay.status_code, 401)
+
+        rotated = self.client.post(self.url, {"refresh": response.data["refresh"]}, format="json")
+        self.assertEqual(rotated.status_code, 200)
+
+    def test_prune_expired_tokens_keeps_live_rows(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti="expired-1", expires_at=now - timedelta(days=1))
+        RevokedToken.objects.create(jti="expired-2", expires_at=now - timedelta(minutes=1))
+        RevokedToken.objects.create(jti="live", expires_at=now + timedelta(days=1))
+
+        out = StringIO()
+        call_command("prune_expired_tokens", batch_size=1, stdout=out)
+
+        self.assertIn("Pruned 2", out.getvalue())
+        self.assertEqual(list(RevokedToken.objects.values_list("jti", flat=True)), ["live"])
+
+
+class CachedPermissionBackendTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email="perms@example.com",
+            password="password123",
+            full_name="Perms User",
+        )
+        self.permission = Permission.objects.get(codename="view_address")
+
+    def test_permissions_are_served_from_cache(self):
+        self.user.user_permissions.add(self.permission)
+        self.assertTrue(CustomUser.objects.get(pk=self.user.pk).has_perm("accounts.view_address"))
+
+        fresh = CustomUser.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(fresh.has_perm("accounts.view_address"))
+
+    def test_group_permission_change_invalidates_cache(self):
+        group = Group.objects.create(name="support")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(group)
+        self.assertFalse(CustomUser.objects.get(pk=self.user.pk).has_perm("accounts.view_address"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            group.permissions.add(self.permission)
+
+        self.assertTrue(CustomUser.objects.get(pk=self.user.pk).has_perm("accounts.view_address"))
+
+    def test_cache_is_invalidated_only_on_commit(self):
+        group = Group.objects.create(name="support")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(group)
+        self.assertFalse(CustomUser.objects.get(pk=self.user.pk).has_perm("accounts.view_address"))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            group.permissions.add(self.permission)
+            # Not committed yet: the version is unchanged, so nothing read now
+            # can be cached under the version that follows the commit
+            fresh = CustomUser.objects.get(pk=self.user.pk)
+            with self.assertNumQueries(0):
+                self.assertFalse(fresh.has_perm("accounts.view_address"))
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertTrue(CustomUser.objects.get(pk=self.user.pk).has_perm("accounts.view_address"))
+
+
+class AsyncViewsTest(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="async@example.com",
+            password="password123",
+            full_name="Async User",
+        )
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.factory = AsyncRequestFactory()
+
+    async def test_profile_requires_valid_token(self):
+        response = await AsyncProfileView.as_view()(self.factory.get("/"))
+        self.assertEqual(response.status_code, 401)
+
+        response = await AsyncProfileView.as_view()(self.factory.get("/", headers=self.headers))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["email"], "async@example.com")
+
+    async def test_create_and_list_addresses(self):
+        view = AsyncAddressListCreateView.as_view()
+        payload = {
+            "full_name": "Async User",
+            "phone_number": "+123456789",
+            "line1": "1 Async Avenue",
+            "city": "Nairobi",
+            "postal_code": "00100",
+            "country": "Kenya",
+            "is_default": True,
+        }
+
+        created = await view(self.factory.post("/", payload, content_type="application/json", headers=self.headers))
+        self.assertEqual(created.status_code, 201)
+
+        second_default = await view(
+            self.factory.post(
+                "/",
+                {**payload, "line1": "2 Async Avenue"},
+                content_type="application/json",
+                headers=self.headers,
+            )
+        )
+        self.assertEqual(second_default.status_code, 400)
+
+        listed = await view(self.factory.get("/", headers=self.headers))
+        self.assertEqual([item["line1"] for item in listed.data], ["1 Async Avenue"])
+
+    async def test_replayed_post_with_idempotency_key_creates_one_address(self):
+        view = AsyncAddressListCreateView.as_view()
+        payload = {
+            "full_name": "Async User",
+            "phone_number": "+123456789",
+            "line1": "1 Async Avenue",
+            "city": "Nairobi",
+            "postal_code": "00100",
+            "country": "Kenya",
+        }
+        headers = {**self.headers, "Idempotency-Key": "async-retry"}
+
+        first = await view(self.factory.post("/", payload, content_type="application/json", headers=headers))
+        second = await view(self.factory.post("/", payload, content_type="application/json", headers=headers))
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(second.data["id"], first.data["id"])
+        self.assertEqual(await Address.objects.filter(user=self.user).acount(), 1)
+
+
+class LastLoginBufferTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            CustomUser.objects.create_user(
+                email=f"login{i}@example.com",
+                password="password123",
+                full_name=f"Login {i}",
+            )
+            for i in range(3)
+        ]
+
+    def test_logins_are_coalesced_into_one_bulk_update(self):
+        buffer = LastLoginBuffer(interval=60, max_pending=100, autostart=False)
+        earlier = timezone.now() - timedelta(minutes=5)
+        latest = timezone.now()
+        buffer.record(self.users[0].pk, earlier)
+        buffer.record(self.users[0].pk, latest)
+        buffer.record(self.users[1].pk, latest)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 2)
+
+        self.users[0].refresh_from_db()
+        self.users[2].refresh_from_db()
+        self.assertEqual(self.users[0].last_login, latest)
+        self.assertIsNone(self.users[2].last_login)
+
+    def test_login_endpoint_defers_last_login_write(self):
+        response = self.client.post(
+            reverse("login"),
+            {"email": "login0@example.com", "password": "password123"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.users[0].refresh_from_db()
+        self.assertIsNone(self.users[0].last_login)
+        # LAST_LOGIN_FLUSH_AUTOSTART is off in test settings
+        self.assertIsNone(last_login_buffer._thread)
+
+        last_login_buffer.flush()
+        self.users[0].refresh_from_db()
+        self.assertIsNotNone(self.users[0].last_login)
+
+
+class SeedPerfDataCommandTest(TestCase):
+
+    def _seed(self, **options):
+        call_command("seed_perf_data", stdout=StringIO(), **options)
+        return list(
+            Address.objects.order_by("user__email", "line1").values_list(
+                "user__email", "user__full_name", "line1", "postal_code", "is_default"
+            )
+        )
+
+    def test_generates_users_and_addresses_deterministically(self):
+        first = self._seed(users=5, addresses_per_user=3, seed=7, batch_size=2)
+
+        self.assertEqual(CustomUser.objects.count(), 5)
+        self.assertEqual(len(first), 15)
+        self.assertEqual(Address.objects.filter(is_default=True).count(), 5)
+        self.assertTrue(CustomUser.objects.get(email="perf-user-0@example.com").check_password("perf-password"))
+
+        CustomUser.objects.all().delete()
+        self.assertEqual(self._seed(users=5, addresses_per_user=3, seed=7, batch_size=2), first)
+
+
+# ---------------------------
+# Query guardrails
+# ---------------------------
+class QueryGuardMixin:
+    """
+    ``assertQueries(n)`` fails unless the block runs exactly ``n`` queries and
+    none of them needs a full table scan of a guarded table. Each captured
+    SELECT/UPDATE/DELETE is re-run through EXPLAIN. Transaction control
+    (BEGIN, SAVEPOINT, ...) is not counted: inside a TestCase it differs from
+    what production runs.
+    """
+    guarded_tables = ("accounts_customuser", "accounts_address")
+    transaction_statements = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+    @contextmanager
+    def assertQueries(self, count):
+        with CaptureQueriesContext(connection) as captured:
+            yield captured
+        statements = [
+            query["sql"] for query in captured
+            if query["sql"].split(None, 1)[0].upper() not in self.transaction_statements
+        ]
+        self.assertEqual(
+            len(statements), count,
+            f"{len(statements)} queries executed, {count} expected:\n" + "\n".join(statements),
+        )
+        for sql in statements:
+            if sql.split(None, 1)[0].upper() not in ("SELECT", "UPDATE", "DELETE"):
+                continue
+            for table in self._full_scans(sql):
+                self.fail(f"Full table scan of {table}:\n{sql}")
+
+    def _full_scans(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # The planner prefers seq scans on tiny test tables; with them
+                # disabled, one only shows up when no index can serve the query.
+                cursor.execute("SET enable_seqscan = off")
+                try:
+                    cursor.execute("EXPLAIN " + sql)
+                    plan = [row[0] for row in cursor.fetchall()]
+                finally:
+                    cursor.execute("RESET enable_seqscan")
+                markers = {table: f"Seq Scan on {table}" for table in self.guarded_tables}
+            else:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+                markers = {table: f"SCAN {table}" for table in self.guarded_tables}
+        return [
+            table for table, marker in markers.items()
+            if any(line.strip().startswith(marker) or f" {marker}" in line for line in plan)
+        ]
+
+
+class QueryGuardrailTest(QueryGuardMixin, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email="queries@example.com",
+            password="password123",
+            full_name="Query User",
+        )
+        self.address = Address.objects.create(user=self.user, is_default=True, **self._address("1 Query Road"))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def _address(self, line1, **extra):
+        return {
+            "full_name": "Query User",
+            "phone_number": "+123456789",
+            "line1": line1,
+            "city": "Nairobi",
+            "postal_code": "00100",
+            "country": "Kenya",
+            **extra,
+        }
+
+    def test_guard_rejects_full_table_scan(self):
+        with self.assertRaisesMessage(AssertionError, "Full table scan of accounts_address"):
+            with self.assertQueries(1):
+                list(Address.objects.filter(city="Nairobi"))
+
+    def test_guard_rejects_wrong_count(self):
+        with self.assertRaisesMessage(AssertionError, "2 queries executed, 1 expected"):
+            with self.assertQueries(1):
+                CustomUser.objects.filter(pk=self.user.pk).exists()
+                Address.objects.filter(pk=self.address.pk).exists()
+
+    def test_register(self):
+        self.client.credentials()
+        with self.assertQueries(2):
+            response = self.client.post(reverse("register"), {
+                "email": "new@example.com",
+                "full_name": "New User",
+                "password": "password123",
+                "confirm_password": "password123",
+            }, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        self.client.credentials()
+        self.addCleanup(last_login_buffer.flush)
+        with self.assertQueries(1):
+            response = self.client.post(
+                reverse("login"), {"email": "queries@example.com", "password": "password123"}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_refresh(self):
+        self.client.credentials()
+        refresh = str(RefreshToken.for_user(self.user))
+        with self.assertQueries(2):
+            response = self.client.post(reverse("token_refresh"), {"refresh": refresh}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_get(self):
+        with self.assertQueries(1):
+            response = self.client.get(reverse("profile"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_put(self):
+        with self.assertQueries(2):
+            response = self.client.put(reverse("profile"), {"full_name": "Renamed"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_password_reset_request(self):
+        self.client.credentials()
+        with self.assertQueries(1):
+            response = self.client.post(reverse("password_reset"), {"email": "queries@example.com"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_address_list(self):
+        Address.objects.create(user=self.user, **self._address("2 Query Road"))
+        with self.assertQueries(2):
+            response = self.client.get(reverse("addresses_list_create"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_address_create(self):
+        with self.assertQueries(2):
+            response = self.client.post(reverse("addresses_list_create"), self._address("2 Query Road"), format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_address_retrieve_update_delete(self):
+        url = reverse("address_detail", args=[self.address.pk])
+        with self.assertQueries(2):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with self.assertQueries(3):
+            self.assertEqual(self.client.patch(url, {"city": "Mombasa"}, format="json").status_code, 200)
+        with self.assertQueries(3):
+            self.assertEqual(self.client.delete(url).status_code, 204)
+
+    def test_address_batch(self):
+        payload = {"create": [self._address(f"{n} Batch Road") for n in range(2, 12)]}
+        with self.assertQueries(3):
+            response = self.client.post(reverse("addresses_batch"), payload, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_daily_stats(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_staff=True)
+        DailyStat.objects.bulk_create(
+            DailyStat(day=timezone.localdate() - timedelta(days=n), country=country, signups=n)
+            for n in range(30) for country in ("", "Kenya")
+        )
+        with self.assertQueries(2):
+            response = self.client.get(reverse("daily_stats"), {"day__gte": timezone.localdate() - timedelta(days=7)})
+        self.assertEqual(response.status_code, 200)
+
+    def test_data_export_inline(self):
+        Address.objects.create(user=self.user, **self._address("2 Query Road"))
+        # The addresses are read while the archive streams
+        with self.assertQueries(3):
+            response = self.client.get(reverse("data_export"))
+            b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+    def test_data_export_detail_and_download(self):
+        job = DataExport.objects.create(user=self.user, status=DataExport.Status.READY, finished_at=timezone.now())
+        job.archive.save(f"{job.pk}.zip", ContentFile(b"PK"))
+        self.addCleanup(job.archive.delete, save=False)
+
+        with self.assertQueries(2):
+            self.assertEqual(self.client.get(reverse("data_export_detail", args=[job.pk])).status_code, 200)
+        with self.assertQueries(2):
+            response = self.client.get(reverse("data_export_download", args=[job.pk]))
+            b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(EXPORT_INLINE_MAX_ADDRESSES=0)
+    def test_data_export_job(self):
+        with self.assertQueries(3):
+            response = self.client.post(reverse("data_export"))
+        self.assertEqual(response.status_code, 202)
+        with self.assertQueries(2):
+            self.assertEqual(self.client.post(reverse("data_export")).status_code, 202)
+        with self.assertQueries(3):
+            self.assertEqual(self.client.get(reverse("data_export")).status_code, 202)
+
+
+class SlowQueryLogTest(APITestCase):
+
+    def setUp(self):
+        slow_queries.clear()
+        self.staff = CustomUser.objects.create_user(
+            email="staff@example.com",
+            password="password123",
+            full_name="Staff User",
+            is_staff=True,
+        )
+
+    def test_slow_queries_are_attributed_to_view_and_frame(self):
+        self.client.force_authenticate(self.staff)
+        payload = {"create": [{
+            "full_name": "Staff User",
+            "phone_number": "+123456789",
+            "line1": "1 Slow Road",
+            "city": "Nairobi",
+            "postal_code": "00100",
+            "country": "Kenya",
+        }]}
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0), self.assertLogs("core.slow_queries", "WARNING"):
+            self.client.post(reverse("addresses_batch"), payload, format="json")
+
+        response = self.client.get(reverse("slow-queries"))
+
+        self.assertEqual(response.status_code, 200)
+        entry = next(e for e in response.data["results"] if e["sql"].startswith('SELECT "accounts_address"'))
+        self.assertEqual(entry["view"], "AddressBatchView")
+        self.assertEqual(entry["method"], "POST")
+        self.assertEqual(entry["params"], "2 positional")
+        self.assertTrue(entry["stack"][0].startswith("accounts/serializers.py:"))
+
+    def test_executemany_shape_does_not_consume_iterators(self):
+        rows = [("a@example.com", "A"), ("b@example.com", "B")]
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0), self.assertLogs("core.slow_queries", "WARNING"):
+            with connection.cursor() as cursor:
+                cursor.execute("CREATE TEMPORARY TABLE shape_probe (email text, name text)")
+                cursor.executemany("INSERT INTO shape_probe VALUES (%s, %s)", rows)
+                cursor.executemany("INSERT INTO shape_probe VALUES (%s, %s)", (row for row in rows))
+                cursor.execute("SELECT COUNT(*) FROM shape_probe")
+                count = cursor.fetchone()[0]
+                cursor.execute("DROP TABLE shape_probe")
+
+        self.assertEqual(count, 4)
+        inserts = [e["params"] for e in slow_queries if e["sql"].startswith("INSERT INTO shape_probe")]
+        self.assertEqual(inserts, ["2 rows x 2", "iterator rows"])
+
+    def test_fast_queries_are_not_recorded(self):
+        self.client.force_authenticate(self.staff)
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=60_000):
+            self.client.get(reverse("addresses_list_create"))
+
+        self.assertEqual(len(slow_queries), 0)
+
+    def test_endpoint_is_staff_only(self):
+        user = CustomUser.objects.create_user(
+            email="plain@example.com",
+            password="password123",
+            full_name="Plain User",
+        )
+        self.client.force_authenticate(user)
+
+        self.assertEqual(self.client.get(reverse("slow-queries")).status_code, 403)
+
+
+class MemoryProfileMiddlewareTest(APITestCase):
+
+    def setUp(self):
+        memory_profiles.clear()
+        self.staff = CustomUser.objects.create_user(
+            email="staff@example.com",
+            password="password123",
+            full_name="Staff User",
+            is_staff=True,
+        )
+        for n in range(5):
+            Address.objects.create(
+                user=self.staff,
+                full_name="Staff User",
+                phone_number="+123456789",
+                line1=f"{n} Memory Road",
+                city="Nairobi",
+                postal_code="00100",
+                country="Kenya",
+            )
+        self.client.force_authenticate(self.staff)
+
+    def test_header_with_token_profiles_request(self):
+        with self.settings(MEMORY_PROFILE_TOKEN="secret"):
+            response = self.client.get(reverse("addresses_list_create"), headers={"X-Memory-Profile": "secret"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("X-Memory-Peak-KB", response)
+        [entry] = memory_profiles
+        self.assertEqual(entry["view"], "AddressListCreateView")
+        self.assertGreater(entry["peak_kb"], 0)
+        self.assertTrue(entry["top"])
+        self.assertFalse(tracemalloc.is_tracing())
+
+        listing = self.client.get(reverse("memory-profiles"))
+        self.assertEqual(listing.data["count"], 1)
+
+    def test_wrong_token_and_zero_sample_rate_skip_profiling(self):
+        with self.settings(MEMORY_PROFILE_TOKEN="secret", MEMORY_PROFILE_SAMPLE_RATE=0):
+            response = self.client.get(reverse("addresses_list_create"), headers={"X-Memory-Profile": "guess"})
+
+        self.assertNotIn("X-Memory-Peak-KB", response)
+        self.assertEqual(len(memory_profiles), 0)
+
+    def test_sampled_streaming_response_is_profiled_until_exhausted(self):
+        def stream(request):
+            return StreamingHttpResponse(str(n).encode() * 1000 for n in range(10))
+
+        middleware = MemoryProfileMiddleware(stream)
+        with self.settings(MEMORY_PROFILE_SAMPLE_RATE=1):
+            response = middleware(RequestFactory().get("/export/"))
+            self.assertTrue(tracemalloc.is_tracing())
+            b"".join(response.streaming_content)
+
+        self.assertFalse(tracemalloc.is_tracing())
+        [entry] = memory_profiles
+        self.assertEqual(entry["path"], "/export/")
+
+    def test_unconsumed_streaming_response_is_finished_on_close(self):
+        def stream(request):
+            return StreamingHttpResponse(str(n).encode() * 1000 for n in range(10))
+
+        middleware = MemoryProfileMiddleware(stream)
+        with self.settings(MEMORY_PROFILE_SAMPLE_RATE=1):
+            response = middleware(RequestFactory().get("/export/"))
+            self.assertTrue(tracemalloc.is_tracing())
+            response.close()
+
+            self.assertFalse(tracemalloc.is_tracing())
+            # The lock was released: the next request is profiled too
+            middleware(RequestFactory().get("/export/")).close()
+
+        self.assertEqual(len(memory_profiles), 2)
+
+    def test_async_streaming_response_is_profiled_until_exhausted(self):
+        async def chunks():
+            for n in range(10):
+                yield str(n).encode() * 1000
+
+        async def stream(request):
+            return StreamingHttpResponse(chunks())
+
+        middleware = MemoryProfileMiddleware(stream)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        async def consume():
+            response = await middleware(RequestFactory().get("/export/"))
+            self.assertTrue(tracemalloc.is_tracing())
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        with self.settings(MEMORY_PROFILE_SAMPLE_RATE=1):
+            body = async_to_sync(consume)()
+
+        self.assertEqual(len(body), 10000)
+        self.assertFalse(tracemalloc.is_tracing())
+        [entry] = memory_profiles
+        self.assertEqual(entry["path"], "/export/")
+
+    def test_endpoint_is_staff_only(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse("memory-profiles")).status_code, 401)
+
+
+# ---------------------------
+# Logging
+# ---------------------------
+class BlockingStream(StringIO):
+    """A log stream whose writes wait until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.release.wait(5)
+        return super().write(text)
+
+
+class StructuredLoggingTest(TestCase):
+
+    def _record(self, exc, path="/api/accounts/profile/", view="ProfileView"):
+        try:
+            raise exc
+        except Exception:
+            record = logging.getLogger("test").makeRecord(
+                "test", logging.ERROR, __file__, 1, "Unhandled exception occurred", None, sys.exc_info(),
+                extra={"path": path, "view": view, "method": "GET"},
+            )
+        return record
+
+    def test_rate_limit_collapses_identical_errors(self):
+        rate_limit = ErrorRateLimitFilter(window=60)
+
+        with mock.patch("core.logs.time.monotonic", return_value=1000):
+            passed = [rate_limit.filter(self._record(RuntimeError("boom"))) for _ in range(3)]
+            self.assertTrue(rate_limit.filter(self._record(RuntimeError("boom"), path="/api/other/")))
+            self.assertTrue(rate_limit.filter(self._record(KeyError("boom"))))
+        self.assertEqual(passed, [True, False, False])
+
+        later = self._record(RuntimeError("boom"))
+        with mock.patch("core.logs.time.monotonic", return_value=1061):
+            self.assertTrue(rate_limit.filter(later))
+        self.assertEqual(later.suppressed, 2)
+
+    def test_background_handler_writes_json_off_thread(self):
+        stream = StringIO()
+        handler = BackgroundHandler(stream=stream)
+        handler.setFormatter(JsonFormatter())
+
+        handler.handle(self._record(RuntimeError("boom")))
+        handler.close()
+
+        payload = json.loads(stream.getvalue())
+        self.assertEqual(payload["level"], "ERROR")
+        self.assertEqual(payload["view"], "ProfileView")
+        self.assertEqual(payload["exception"]["type"], "RuntimeError")
+        self.assertIn("Traceback", payload["exception"]["traceback"])
+
+    def test_background_handler_drops_instead_of_blocking(self):
+        stream = BlockingStream()
+        handler = BackgroundHandler(maxsize=2, stream=stream)
+        handler.setFormatter(JsonFormatter())
+
+        started = time.monotonic()
+        for n in range(20):
+            handler.handle(self._record(RuntimeError(f"boom {n}")))
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1)
+        self.assertGreater(handler.dropped, 0)
+        stream.release.set()
+        handler.close()
+
+    def test_exception_handler_logs_request_context(self):
+        request = RequestFactory().get("/api/accounts/profile/")
+
+        with self.assertLogs("core.exception_handler", "ERROR") as logs:
+            response = custom_exception_handler(RuntimeError("boom"), {"request": request, "view": ProfileView()})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(logs.records[0].view, "ProfileView")
+        self.assertEqual(logs.records[0].path, "/api/accounts/profile/")
+
+
+# ---------------------------
+# Warm-up
+# ---------------------------
+STARTUP_PROBE = """
+import json, sys
+
+import django
+django.setup()
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.db import connection
+from django.test import Client
+from django.urls import get_resolver
+client = Client(HTTP_HOST="localhost")
+client.handler.load_middleware()
+if settings.WARM_UP_ON_READY:
+    # What gunicorn's post_worker_init does after the fork
+    from accounts.warmup import warm_up_connections
+    warm_up_connections()
+
+# Process state before the first request
+state = {
+    "modules": sorted(name for name in ("accounts.views", "rest_framework_simplejwt.backends", "jwt") if name in sys.modules),
+    "urls_populated": get_resolver()._populated,
+    "hashers_loaded": get_hashers.cache_info().currsize > 0,
+    "connection_open": connection.connection is not None,
+}
+
+response = client.post("/api/accounts/register/", {}, content_type="application/json")
+assert response.status_code == 400, response.status_code
+print(json.dumps(state))
+"""
+
+
+class WarmUpTest(TestCase):
+
+    def _probe(self, warm_up):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "core.test_settings", "DJANGO_WARM_UP": str(warm_up)}
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_warm_up_initializes_the_process_before_the_first_request(self):
+        cold = self._probe(warm_up=False)
+        warm = self._probe(warm_up=True)
+
+        self.assertEqual(cold["modules"], [])
+        self.assertFalse(cold["urls_populated"])
+        self.assertFalse(cold["hashers_loaded"])
+        self.assertFalse(cold["connection_open"])
+
+        self.assertEqual(warm["modules"], ["accounts.views", "jwt", "rest_framework_simplejwt.backends"])
+        self.assertTrue(warm["urls_populated"])
+        self.assertTrue(warm["hashers_loaded"])
+        self.assertTrue(warm["connection_open"])
+
+    def test_warm_up_does_not_query_the_database(self):
+        with self.assertNumQueries(0):
+            warm_up()
+
+
+# ---------------------------
+# Compression
+# ---------------------------
+class APICompressionTest(APITestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="gzip@example.com",
+            password="password123",
+            full_name="Gzip User",
+        )
+        Address.objects.bulk_create(
+            Address(
+                user=self.user,
+                full_name="Gzip User",
+                phone_number="+123456789",
+                line1=f"{n} Compression Road",
+                city="Nairobi",
+                postal_code="00100",
+                country="Kenya",
+            )
+            for n in range(30)
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_large_json_is_gzipped(self):
+        plain = self.client.get(reverse("addresses_list_create"))
+        response = self.client.get(reverse("addresses_list_create"), headers={"Accept-Encoding": "gzip, deflate"})
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+
+    def test_small_bodies_and_refused_codings_are_not_compressed(self):
+        health = self.client.get(reverse("health-check"), headers={"Accept-Encoding": "gzip"})
+        refused = self.client.get(reverse("addresses_list_create"), headers={"Accept-Encoding": "gzip;q=0, identity"})
+
+        self.assertFalse(health.has_header("Content-Encoding"))
+        self.assertFalse(refused.has_header("Content-Encoding"))
+
+    def test_streaming_json_and_etag(self):
+        def view(request):
+            response = StreamingHttpResponse(
+                (json.dumps({"n": n, "pad": "x" * 100}).encode() + b"\n" for n in range(50)),
+                content_type="application/json",
+            )
+            response["ETag"] = '"v1"'
+            return response
+
+        request = RequestFactory().get("/api/export/", headers={"Accept-Encoding": "gzip"})
+        response = APICompressionMiddleware(view)(request)
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], 'W/"v1"')
+        lines = gzip.decompress(b"".join(response.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 50)
+
+    def test_async_stream_is_one_gzip_member_flushed_per_chunk(self):
+        async def chunks():
+            for n in range(20):
+                yield json.dumps({"n": n, "pad": "x" * 100}).encode() + b"\n"
+
+        async def view(request):
+            return StreamingHttpResponse(chunks(), content_type="application/json")
+
+        async def consume():
+            request = RequestFactory().get("/api/export/", headers={"Accept-Encoding": "gzip"})
+            response = await APICompressionMiddleware(view)(request)
+            return [part async for part in response.streaming_content]
+
+        parts = async_to_sync(consume)()
+
+        decompressor = zlib.decompressobj(wbits=31)
+        # Each chunk is decodable as soon as it is received
+        self.assertEqual(len(parts), 21)
+        self.assertEqual(json.loads(decompressor.decompress(parts[0]))["n"], 0)
+        body = b"".join(parts)
+        decompressor = zlib.decompressobj(wbits=31)
+        self.assertEqual(len(decompressor.decompress(body).splitlines()), 20)
+        self.assertTrue(decompressor.eof)
+        self.assertEqual(decompressor.unused_data, b"")
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate("gzip, deflate"), "gzip")
+        self.assertEqual(negotiate("*"), "br" if brotli else "gzip")
+        self.assertIsNone(negotiate(""))
+        self.assertIsNone(negotiate("identity, *;q=0"))
+        self.assertEqual(negotiate("br;q=1.0, gzip;q=0.5"), "br" if brotli else "gzip")
+
+
+# ---------------------------
+# Sparse fieldsets
+# ---------------------------
+class SparseFieldsTest(APITestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="sparse@example.com",
+            password="password123",
+            full_name="Sparse User",
+        )
+        self.address = Address.objects.create(
+            user=self.user,
+            full_name="Sparse User",
+            phone_number="+123456789",
+            line1="1 Sparse Road",
+            city="Nairobi",
+            postal_code="00100",
+            country="Kenya",
+            is_default=True,
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_fields_narrows_output_and_query(self):
+        url = reverse("addresses_list_create") + "?fields=id,line1,city,is_default"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data[0], {"id": self.address.pk, "line1": "1 Sparse Road", "city": "Nairobi", "is_default": True}
+        )
+        [select] = [query["sql"] for query in queries if 'FROM "accounts_address"' in query["sql"]]
+        self.assertNotIn("phone_number", select)
+        self.assertNotIn("postal_code", select)
+
+    def test_omit_drops_fields(self):
+        response = self.client.get(reverse("address_detail", args=[self.address.pk]) + "?omit=created_at,updated_at,user")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("created_at", response.data)
+        self.assertNotIn("user", response.data)
+        self.assertIn("phone_number", response.data)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse("addresses_list_create") + "?fields=id,password")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", str(response.data))
+
+    def test_writes_validate_everything_and_return_the_fieldset(self):
+        response = self.client.patch(
+            reverse("address_detail", args=[self.address.pk]) + "?fields=id,city", {"city": "Mombasa"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"id": self.address.pk, "city": "Mombasa"})
+        self.address.refresh_from_db()
+        self.assertEqual((self.address.city, self.address.phone_number), ("Mombasa", "+123456789"))
+
+    def test_profile_and_login_user_block(self):
+        profile = self.client.get(reverse("profile") + "?fields=email")
+        login = self.client.post(
+            reverse("login") + "?fields=id,email",
+            {"email": "sparse@example.com", "password": "password123"},
+            format="json",
+        )
+        self.addCleanup(last_login_buffer.flush)
+
+        self.assertEqual(profile.data, {"email": "sparse@example.com"})
+        self.assertEqual(login.data["user"], {"id": self.user.pk, "email": "sparse@example.com"})
+        self.assertIn("access", login.data)
+
+
+# ---------------------------
+# Batch endpoint
+# ---------------------------
+class BatchAPITest(APITestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="batch@example.com",
+            password="password123",
+            full_name="Batch User",
+        )
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+        self.url = reverse("batch")
+
+    def address(self, **overrides):
+        return {
+            "full_name": "Batch User",
+            "phone_number": "+123456789",
+            "line1": "1 Batch Street",
+            "city": "Nairobi",
+            "postal_code": "00100",
+            "country": "Kenya",
+            **overrides,
+        }
+
+    def test_page_load_in_one_round_trip(self):
+        Address.objects.create(user=self.user, **self.address())
+        payload = {
+            "requests": [
+                {"method": "GET", "path": reverse("profile")},
+                {"method": "GET", "path": reverse("addresses_list_create") + "?fields=id,city"},
+                {"method": "POST", "path": reverse("token_refresh"), "body": {"refresh": str(self.refresh)}},
+            ]
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        profile, addresses, refreshed = response.data["responses"]
+        self.assertEqual(profile["status"], 200)
+        self.assertEqual(profile["body"]["email"], "batch@example.com")
+        self.assertEqual(addresses["body"][0]["city"], "Nairobi")
+        self.assertEqual(set(addresses["body"][0]), {"id", "city"})
+        self.assertEqual(refreshed["status"], 200)
+        self.assertIn("access", refreshed["body"])
+        # One lookup for the bearer token of the whole batch, one by the
+        # refresh serializer's own is_active check on the refresh token
+        user_lookups = [
+            query["sql"] for query in queries
+            if query["sql"].startswith("SELECT") and 'FROM "accounts_customuser"' in query["sql"]
+        ]
+        self.assertEqual(len(user_lookups), 2)
+
+    def test_sub_requests_keep_their_own_status(self):
+        response = self.client.post(
+            self.url,
+            {
+                "requests": [
+                    {"method": "POST", "path": reverse("addresses_list_create"), "body": self.address()},
+                    {"method": "POST", "path": reverse("addresses_list_create"), "body": {"city": "Nairobi"}},
+                    {"method": "GET", "path": "/api/does-not-exist/"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data["rolled_back"])
+        self.assertEqual([item["status"] for item in response.data["responses"]], [201, 400, 404])
+        self.assertEqual(Address.objects.filter(user=self.user).count(), 1)
+
+    def test_atomic_batch_rolls_back_on_failure(self):
+        response = self.client.post(
+            self.url,
+            {
+                "atomic": True,
+                "requests": [
+                    {"method": "POST", "path": reverse("addresses_list_create"), "body": self.address()},
+                    {"method": "POST", "path": reverse("addresses_list_create"), "body": {"city": "Nairobi"}},
+                    {"method": "GET", "path": reverse("profile")},
+                ],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["rolled_back"])
+        self.assertEqual([item["status"] for item in response.data["responses"]], [201, 400, 424])
+        self.assertFalse(Address.objects.filter(user=self.user).exists())
+
+    def test_anonymous_batch_runs_sub_requests_anonymously(self):
+        self.client.credentials()
+        response = self.client.post(
+            self.url, {"requests": [{"method": "GET", "path": reverse("profile")}]}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["responses"][0]["status"], 401)
+
+    def test_sub_requests_share_the_client_ip_throttle(self):
+        cache.clear()
+        self.client.credentials()
+        register = {"method": "POST", "path": reverse("register"), "body": {}}
+
+        response = self.client.post(
+            self.url, {"requests": [register] * 11}, format="json", HTTP_X_FORWARDED_FOR="203.0.113.5"
+        )
+
+        statuses = [item["status"] for item in response.data["responses"]]
+        self.assertEqual(statuses, [400] * 10 + [429])
+        # A new outer X-Forwarded-For does not buy a new bucket either
+        response = self.client.post(
+            self.url, {"requests": [register]}, format="json", HTTP_X_FORWARDED_FOR="203.0.113.6"
+        )
+        self.assertEqual(response.data["responses"][0]["status"], 429)
+
+    def test_invalid_batches_are_rejected(self):
+        invalid = [
+            {"requests": [{"method": "POST", "path": self.url, "body": {"requests": []}}]},
+            {"requests": [{"method": "GET", "path": "/admin/"}]},
+            {"requests": [{"method": "GET", "path": reverse("profile"), "headers": {"Authorization": "Bearer x"}}]},
+            {"requests": [{"method": "GET", "path": reverse("profile"), "headers": {"X-Forwarded-For": "1.2.3.4"}}]},
+            {"requests": [{"method": "GET", "path": reverse("profile")}] * 21},
+            {"requests": []},
+        ]
+        for payload in invalid:
+            with self.subTest(payload=payload["requests"][:1]):
+                response = self.client.post(self.url, payload, format="json")
+                self.assertEqual(response.status_code, 400)
+
+
+# ---------------------------
+# Address fingerprints
+# ---------------------------
+class AddressFingerprintTest(APITestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="fingerprint@example.com",
+            password="password123",
+            full_name="Fingerprint User",
+        )
+
+    def address(self, **overrides):
+        fields = {
+            "user": self.user,
+            "full_name": "Fingerprint User",
+            "phone_number": "+123456789",
+            "line1": "12 Moi Avenue",
+            "city": "Nairobi",
+            "postal_code": "00100",
+            "country": "Kenya",
+            **overrides,
+        }
+        return Address(**fields)
+
+    def test_normalization(self):
+        self.assertEqual(
+            address_fingerprint("12 Moi Avenue", None, "Nairobi", "SW1A 1AA", "Kenya"),
+            address_fingerprint(" 12  moi avenue.", "", "NAIROBI", "sw1a1aa", "kenya"),
+        )
+        self.assertNotEqual(
+            address_fingerprint("12 Moi Avenue", None, "Nairobi", "00100", "Kenya"),
+            address_fingerprint("12 Moi Avenue", "Apt 4", "Nairobi", "00100", "Kenya"),
+        )
+
+    def test_maintained_by_save_and_bulk_paths(self):
+        address = self.address()
+        address.save()
+        self.assertEqual(address.fingerprint, address.compute_fingerprint())
+
+        address.line1 = "14 Moi Avenue"
+        address.save(update_fields=["line1"])
+        address.refresh_from_db()
+        self.assertEqual(address.fingerprint, address_fingerprint("14 Moi Avenue", None, "Nairobi", "00100", "Kenya"))
+
+        [created] = Address.objects.bulk_create([self.address(line1="1 Ngong Road")])
+        created.city = "Mombasa"
+        Address.objects.bulk_update([created], ["city"])
+        created.refresh_from_db()
+        self.assertEqual(created.fingerprint, address_fingerprint("1 Ngong Road", None, "Mombasa", "00100", "Kenya"))
+
+    def test_not_exposed_by_the_api(self):
+        address = self.address()
+        address.save()
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(reverse("address_detail", args=[address.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("fingerprint", response.data)
+
+    def test_backfill_migration(self):
+        migration = import_module("accounts.migrations.0003_address_fingerprint")
+        Address.objects.bulk_create([self.address(line1=f"{i} Moi Avenue") for i in range(5)])
+        Address.objects.update(fingerprint="")
+
+        with mock.patch.object(migration, "BACKFILL_BATCH_SIZE", 2):
+            migration.backfill_fingerprints(django_apps, mock.Mock(connection=connection))
+
+        for address in Address.objects.all():
+            self.assertEqual(address.fingerprint, address.compute_fingerprint())
+
+    def test_dedupe_addresses_command(self):
+        kept = self.address(line1="12 Moi Avenue", is_default=True)
+        kept.save()
+        duplicate = self.address(line1="12 moi avenue.", state="Nairobi County")
+        duplicate.save()
+        other = self.address(line1="14 Moi Avenue")
+        other.save()
+        stranger = CustomUser.objects.create_user(email="stranger@example.com", password="password123", full_name="S")
+        self.address(user=stranger).save()
+        raw = self.address(line1="99 Raw Road")
+        raw.save()
+        raw_copy = self.address(line1="99 raw road")
+        raw_copy.save()
+        Address.objects.filter(pk__in=[raw.pk, raw_copy.pk]).update(fingerprint="")
+
+        out = StringIO()
+        call_command("dedupe_addresses", "--dry-run", stdout=out)
+        self.assertIn("1 duplicate groups, 1 addresses would be removed", out.getvalue())
+        self.assertEqual(Address.objects.count(), 6)
+
+        call_command("dedupe_addresses", stdout=StringIO())
+
+        self.assertEqual(
+            set(Address.objects.filter(user=self.user).values_list("pk", flat=True)),
+            {kept.pk, other.pk, raw.pk, raw_copy.pk},
+        )
+        kept.refresh_from_db()
+        self.assertEqual(kept.state, "Nairobi County")
+        self.assertEqual(Address.objects.filter(user=stranger).count(), 1)
+
+
+# ---------------------------
+# Retention purge
+# ---------------------------
+class PurgeInactiveUsersCommandTest(TestCase):
+
+    def user(self, email, is_active, joined_days_ago, login_days_ago=None):
+        now = timezone.now()
+        user = CustomUser.objects.create_user(
+            email=email,
+            password="password123",
+            full_name="Purge User",
+            is_active=is_active,
+            date_joined=now - timedelta(days=joined_days_ago),
+        )
+        if login_days_ago is not None:
+            CustomUser.objects.filter(pk=user.pk).update(last_login=now - timedelta(days=login_days_ago))
+        for n in range(3):
+            Address.objects.create(
+                user=user,
+                full_name="Purge User",
+                phone_number="+123456789",
+                line1=f"{n} Purge Road",
+                city="Nairobi",
+                postal_code="00100",
+                country="Kenya",
+            )
+        return user
+
+    def setUp(self):
+        self.stale = self.user("stale@example.com", False, joined_days_ago=900, login_days_ago=500)
+        self.never_logged_in = self.user("never@example.com", False, joined_days_ago=400)
+        self.stale.groups.add(Group.objects.create(name="Purged"))
+        self.kept = [
+            self.user("active@example.com", True, joined_days_ago=900, login_days_ago=800),
+            self.user("recent-login@example.com", False, joined_days_ago=900, login_days_ago=10),
+            self.user("recent-signup@example.com", False, joined_days_ago=10),
+        ]
+
+    def test_dry_run_reports_without_deleting(self):
+        out = StringIO()
+        call_command("purge_inactive_users", "--days=365", "--dry-run", stdout=out)
+
+        self.assertIn("2 users inactive", out.getvalue())
+        self.assertIn("6 accounts.Address rows deleted", out.getvalue())
+        self.assertEqual(CustomUser.objects.count(), 5)
+
+    def test_purges_in_batches_with_raw_deletes(self):
+        with CaptureQueriesContext(connection) as queries:
+            call_command("purge_inactive_users", "--days=365", "--batch-size=1", "--chunk-size=2", stdout=StringIO())
+
+        self.assertEqual(set(CustomUser.objects.all()), set(self.kept))
+        self.assertEqual(Address.objects.count(), 9)
+        self.assertFalse(CustomUser.groups.through.objects.filter(customuser_id=self.stale.pk).exists())
+        deletes = [query["sql"] for query in queries if query["sql"].startswith("DELETE")]
+        # Per user: two address chunks and the user itself, each bounded by pk
+        self.assertEqual(sum('"accounts_address"' in sql for sql in deletes), 4)
+        self.assertTrue(all(" IN (" in sql for sql in deletes))
+
+    def test_user_reactivated_mid_batch_keeps_everything(self):
+        lock = PurgeCommand._lock
+
+        def reactivate_then_lock(command, candidates, pks):
+            CustomUser.objects.filter(pk=self.stale.pk).update(is_active=True)
+            return lock(command, candidates, pks)
+
+        with mock.patch.object(PurgeCommand, "_lock", autospec=True, side_effect=reactivate_then_lock):
+            call_command("purge_inactive_users", "--days=365", stdout=StringIO())
+
+        self.assertTrue(CustomUser.objects.filter(pk=self.stale.pk).exists())
+        self.assertEqual(Address.objects.filter(user=self.stale).count(), 3)
+        self.assertTrue(self.stale.groups.exists())
+        self.assertFalse(CustomUser.objects.filter(pk=self.never_logged_in.pk).exists())
+
+    def test_export_archives_are_deleted_after_commit(self):
+        job = DataExport.objects.create(user=self.stale, status=DataExport.Status.READY)
+        job.archive.save(f"{job.pk}.zip", ContentFile(b"archive"))
+        storage, name = job.archive.storage, job.archive.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("purge_inactive_users", "--days=365", stdout=StringIO())
+
+        self.assertFalse(DataExport.objects.exists())
+        self.assertFalse(storage.exists(name))
+
+
+# ---------------------------
+# Dashboard rollups
+# ---------------------------
+@override_settings(ROLLUP_SAFETY_LAG=0)
+class DailyStatsRollupTest(APITestCase):
+
+    def setUp(self):
+        self.day = timezone.now() - timedelta(days=3)
+        self.staff = CustomUser.objects.create_user(
+            email="staff@example.com", password="password123", full_name="Staff", is_staff=True
+        )
+        CustomUser.objects.filter(pk=self.staff.pk).update(date_joined=self.day)
+        for index, (country, is_active) in enumerate([("Kenya", True), ("Kenya", False), ("Uganda", True)]):
+            user = CustomUser.objects.create_user(
+                email=f"rollup{index}@example.com",
+                password="password123",
+                full_name="Rollup",
+                is_active=is_active,
+                date_joined=self.day,
+            )
+            self.add_address(user, country)
+
+    def add_address(self, user, country):
+        Address.objects.create(
+            user=user,
+            full_name="Rollup",
+            phone_number="+123456789",
+            line1=f"{user.pk} Rollup Road",
+            city="Nairobi",
+            postal_code="00100",
+            country=country,
+        )
+
+    def stats(self):
+        return {
+            (stat.day, stat.country): (stat.signups, stat.addresses)
+            for stat in DailyStat.objects.all()
+        }
+
+    def test_rollup_is_incremental(self):
+        call_command("rollup_stats", "--batch-size=2", stdout=StringIO())
+
+        created, today = timezone.localdate(self.day), timezone.localdate()
+        self.assertEqual(
+            self.stats(),
+            {(created, ""): (4, 0), (today, "Kenya"): (0, 2), (today, "Uganda"): (0, 1)},
+        )
+
+        self.add_address(self.staff, "Kenya")
+        with CaptureQueriesContext(connection) as queries:
+            call_command("rollup_stats", stdout=StringIO())
+
+        self.assertEqual(self.stats()[(today, "Kenya")], (0, 3))
+        self.assertEqual(self.stats()[(created, "")], (4, 0))
+        # Only the new address is read; neither table is aggregated as a whole
+        self.assertFalse(any("COUNT" in query["sql"] and "accounts_customuser" in query["sql"] for query in queries))
+
+        call_command("rollup_stats", "--rebuild", stdout=StringIO())
+        self.assertEqual(self.stats()[(today, "Kenya")], (0, 3))
+
+    @override_settings(ROLLUP_SAFETY_LAG=60)
+    def test_rows_inside_the_safety_lag_wait_for_the_next_run(self):
+        # Addresses created just now may have been committed out of pk order
+        Address.objects.update(created_at=self.day)
+        recent = CustomUser.objects.create_user(email="recent@example.com", password="password123", full_name="R")
+        self.add_address(recent, "Kenya")
+        CustomUser.objects.create_user(
+            email="backdated@example.com", password="password123", full_name="B", date_joined=self.day
+        )
+
+        call_command("rollup_stats", stdout=StringIO())
+
+        created = timezone.localdate(self.day)
+        # The watermark stops before the recent rows, so the backdated user
+        # behind them is not counted yet either
+        self.assertEqual(self.stats(), {(created, ""): (4, 0), (created, "Kenya"): (0, 2), (created, "Uganda"): (0, 1)})
+
+        CustomUser.objects.filter(pk=recent.pk).update(date_joined=self.day)
+        Address.objects.update(created_at=self.day)
+        call_command("rollup_stats", stdout=StringIO())
+
+        self.assertEqual(self.stats(), {(created, ""): (6, 0), (created, "Kenya"): (0, 3), (created, "Uganda"): (0, 1)})
+
+    def test_staff_api(self):
+        call_command("rollup_stats", stdout=StringIO())
+        url = reverse("daily_stats")
+
+        self.client.force_authenticate(CustomUser.objects.get(email="rollup0@example.com"))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(url, {"country": "Uganda", "day__gte": timezone.localdate().isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            [{"day": timezone.localdate().isoformat(), "country": "Uganda", "signups": 0, "addresses": 1}],
+        )
+
+
+# ---------------------------
+# Personal data export
+# ---------------------------
+class DataExportTest(APITestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="export@example.com",
+            password="password123",
+            full_name="Export User",
+        )
+        for n in range(5):
+            Address.objects.create(
+                user=self.user,
+                full_name="Export User",
+                phone_number="+123456789",
+                line1=f"{n} Export Road",
+                city="Nairobi",
+                postal_code="00100",
+                country="Kenya",
+            )
+        self.client.force_authenticate(self.user)
+        self.addCleanup(self.delete_archives)
+
+    def delete_archives(self):
+        for job in DataExport.objects.exclude(archive=""):
+            job.archive.delete(save=False)
+
+    def read_archive(self, response):
+        content = b"".join(response.streaming_content)
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            return {name: json.loads(archive.read(name)) for name in archive.namelist()}
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_small_export_is_streamed_inline(self):
+        response = self.client.get(reverse("data_export"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        files = self.read_archive(response)
+        self.assertEqual(set(files), {"profile.json", "login.json", "addresses.json", "manifest.json"})
+        self.assertEqual(files["profile.json"]["email"], "export@example.com")
+        self.assertEqual([address["line1"] for address in files["addresses.json"]], [f"{n} Export Road" for n in range(5)])
+        self.assertIn("last_login", files["login.json"])
+
+    @override_settings(EXPORT_INLINE_MAX_ADDRESSES=3)
+    def test_large_export_runs_as_a_background_job(self):
+        # GET never starts a job
+        self.assertEqual(self.client.get(reverse("data_export")).status_code, 404)
+        self.assertFalse(DataExport.objects.exists())
+
+        response = self.client.post(reverse("data_export"))
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data["id"]
+        self.assertEqual(response["Location"], response.data["poll_url"])
+        self.assertIsNone(response.data["download_url"])
+        # Asking again while it is pending returns the same job
+        self.assertEqual(self.client.get(reverse("data_export")).data["id"], job_id)
+        self.assertEqual(self.client.post(reverse("data_export")).data["id"], job_id)
+        self.assertEqual(self.client.get(reverse("data_export_download", args=[job_id])).status_code, 404)
+
+        call_command("process_data_exports", stdout=StringIO())
+
+        poll = self.client.get(reverse("data_export_detail", args=[job_id]))
+        self.assertEqual(poll.data["status"], "ready")
+        download = self.client.get(poll.data["download_url"])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(len(self.read_archive(download)["addresses.json"]), 5)
+
+        other = CustomUser.objects.create_user(email="other-export@example.com", password="password123", full_name="O")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(reverse("data_export_detail", args=[job_id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("data_export_download", args=[job_id])).status_code, 404)
+
+    def test_only_one_active_job_per_user(self):
+        DataExport.objects.create(user=self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DataExport.objects.create(user=self.user)
+
+        DataExport.objects.update(status=DataExport.Status.READY)
+        DataExport.objects.create(user=self.user)
+
+    def test_job_created_and_finished_concurrently_starts_a_new_one(self):
+        finished = DataExport(user=self.user, status=DataExport.Status.READY)
+        original_create = DataExport.objects.create
+
+        def create_after_a_concurrent_job(**kwargs):
+            # The concurrent job wins the constraint, then finishes before we look again
+            if not finished.pk:
+                DataExport.objects.bulk_create([DataExport(user=self.user)])
+                DataExport.objects.update(status=DataExport.Status.READY)
+                finished.pk = DataExport.objects.get().pk
+                raise IntegrityError("unique_active_data_export")
+            return original_create(**kwargs)
+
+        with mock.patch.object(DataExport.objects, "create", side_effect=create_after_a_concurrent_job):
+            response = self.client.post(reverse("data_export"))
+
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(str(response.data["id"]), str(finished.pk))
+        self.assertEqual(DataExport.objects.filter(status=DataExport.Status.PENDING).count(), 1)
+
+    def test_superseded_worker_does_not_finish_the_job(self):
+        DataExport.objects.create(user=self.user)
+        first = claim_export()
+        DataExport.objects.update(started_at=timezone.now() - timedelta(hours=2))
+        second = claim_export()
+        self.assertEqual(second.attempts, 2)
+
+        build_export(first)
+
+        job = DataExport.objects.get()
+        self.assertEqual(job.status, DataExport.Status.RUNNING)
+        self.assertFalse(job.archive)
+        # The superseded worker's archive was thrown away
+        folder = os.path.dirname(job.archive.field.generate_filename(job, "x.zip"))
+        leftovers = [name for name in job.archive.storage.listdir(folder)[1] if name.startswith(str(job.pk))]
+        self.assertEqual(leftovers, [])
+
+        build_export(second)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DataExport.Status.READY)
+        with job.archive.open("rb"), zipfile.ZipFile(job.archive) as archive:
+            self.assertEqual(len(json.loads(archive.read("addresses.json"))), 5)
+
+    @override_settings(EXPORT_JOB_MAX_ATTEMPTS=2)
+    def test_job_fails_after_max_attempts(self):
+        DataExport.objects.create(user=self.user)
+        for _ in range(2):
+            self.assertIsNotNone(claim_export())
+            DataExport.objects.update(started_at=timezone.now() - timedelta(hours=2))
+
+        self.assertIsNone(claim_export())
+        job = DataExport.objects.get()
+        self.assertEqual(job.status, DataExport.Status.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    @override_settings(EXPORT_ARCHIVE_TTL=0)
+    def test_expired_archives_are_deleted(self):
+        self.client.post(reverse("data_export"))
+        call_command("process_data_exports", stdout=StringIO())
+        job = DataExport.objects.get(user=self.user)
+        storage, name = job.archive.storage, job.archive.name
+        self.assertTrue(storage.exists(name))
+
+        call_command("process_data_exports", stdout=StringIO())
+
+        self.assertFalse(DataExport.objects.exists())
+        self.assertFalse(storage.exists(name))
@@ -0,0 +1,150 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# Refill and consume atomically on the Redis server, using its clock so that
+# every worker sees the same bucket state. Returns the wait in seconds.
+_REDIS_CONSUME = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / refill_rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill_rate) + 1)
+return tostring(wait)
+"""
+
+_local_lock = threading.Lock()
+_redis_script = None
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to ``capacity`` tokens, refilled at
+    ``refill_rate`` tokens per second.
+
+    State lives in the given cache. With Redis the refill-and-consume step is
+    a single atomic script call, so limits hold across workers; other
+    backends fall back to a process-local lock.
+    """
+
+    def __init__(self, capacity, refill_rate, cache_alias="default"):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.cache = caches[cache_alias]
+
+    def consume(self, key, tokens=1):
+        """
+        Take ``tokens`` from the bucket at ``key``.
+
+        Returns 0 when allowed, otherwise the seconds until enough tokens
+        are available.
+        """
+        if isinstance(self.cache, RedisCache):
+            return self._consume_redis(key, tokens)
+        return self._consume_local(key, tokens)
+
+    def _consume_redis(self, key, tokens):
+        global _redis_script
+        key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(key, write=True)
+        if _redis_script is None:
+            # EVALSHA after the first call, so only the digest goes over the wire
+            _redis_script = client.register_script(_REDIS_CONSUME)
+        wait = _redis_script(keys=[key], args=[self.capacity, self.refill_rate, tokens], client=client)
+        return float(wait)
+
+    def _consume_local(self, key, tokens):
+        with _local_lock:
+            now = time.time()
+            level, last = self.cache.get(key, (self.capacity, now))
+            level = min(self.capacity, level + max(0.0, now - last) * self.refill_rate)
+            wait = 0.0
+            if level >= tokens:
+                level -= tokens
+            else:
+                wait = (tokens - level) / self.refill_rate
+            self.cache.set(key, (level, now), timeout=math.ceil(self.capacity / self.refill_rate) + 1)
+        return wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base throttle backed by a :class:`TokenBucket`.
+
+    The rate for ``<view.throttle_scope>_<scope_suffix>`` is read from
+    ``DEFAULT_THROTTLE_RATES`` (e.g. ``"5/min"`` is a burst of 5 refilled over
+    a minute). Scopes without a configured rate are not throttled.
+    """
+    scope_suffix = None
+
+    def get_ident_value(self, request):
+        raise NotImplementedError(".get_ident_value() must be overridden")
+
+    def get_rate(self, view):
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return None, None
+        self.scope = f"{scope}_{self.scope_suffix}"
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return None, None
+        num, period = rate.split("/")
+        return int(num), {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+
+    def allow_request(self, request, view):
+        self.wait_time = 0
+        capacity, duration = self.get_rate(view)
+        if capacity is None:
+            return True
+
+        value = self.get_ident_value(request)
+        if not value:
+            return True
+
+        digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+        bucket = TokenBucket(capacity, capacity / duration)
+        self.wait_time = bucket.consume(f"throttle:{self.scope}:{digest}")
+        return self.wait_time == 0
+
+    def wait(self):
+        return math.ceil(self.wait_time) if self.wait_time else None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Token bucket per client IP, as resolved by DRF from ``REMOTE_ADDR`` and
+    the trusted ``NUM_PROXIES`` hops of ``X-Forwarded-For``.
+    """
+    scope_suffix = "ip"
+
+    def get_ident_value(self, request):
+        return self.get_ident(request)
+
+
+class EmailTokenBucketThrottle(TokenBucketThrottle):
+    """Token bucket per normalized ``email`` in the request body"""
+    scope_suffix = "email"
+
+    def get_ident_value(self, request):
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        if not isinstance(email, str):
+            return None
+        return email.strip().lower()
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     RegisterView,
@@ -8,8 +9,22 @@ from .views import (
     PasswordResetConfirmView,
     AddressListCreateView,
     AddressRetrieveUpdateDeleteView,
+    AddressBatchView,
+    DailyStatListView,
+    DataExportView,
+    DataExportDetailView,
+    DataExportDownloadView,
 )
 
+if settings.ASYNC_API_VIEWS:
+    # Async-native variants for serving under core.asgi
+    from .async_views import (
+        AsyncProfileView as ProfileView,
+        AsyncPasswordResetRequestView as PasswordResetRequestView,
+        AsyncAddressListCreateView as AddressListCreateView,
+        AsyncAddressRetrieveUpdateDeleteView as AddressRetrieveUpdateDeleteView,
+    )
+
 urlpatterns = [
     # Authentication
     path("register/", RegisterView.as_view(), name="register"),
@@ -25,5 +40,14 @@ urlpatterns = [
 
     # Addresses
     path("addresses/", AddressListCreateView.as_view(), name="addresses_list_create"),
+    path("addresses/batch/", AddressBatchView.as_view(), name="addresses_batch"),
     path("addresses/<int:pk>/", AddressRetrieveUpdateDeleteView.as_view(), name="address_detail"),
+
+    # Personal data export
+    path("export/", DataExportView.as_view(), name="data_export"),
+    path("export/<uuid:pk>/", DataExportDetailView.as_view(), name="data_export_detail"),
+    path("export/<uuid:pk>/download/", DataExportDownloadView.as_view(), name="data_export_download"),
+
+    # Dashboard (staff)
+    path("stats/daily/", DailyStatListView.as_view(), name="daily_stats"),
 ]
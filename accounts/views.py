@@ -9,39 +9,64 @@ from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 
 from .serializers import (
     RegisterSerializer,
     CustomTokenObtainPairSerializer,
+    RotatingTokenRefreshSerializer,
     UserProfileSerializer,
     PasswordResetRequestSerializer,
     PasswordResetConfirmSerializer,
     AddressSerializer,
+    AddressBatchSerializer,
+    DailyStatSerializer,
+    DataExportSerializer,
 )
-from .models import Address
+from .exports import export_archive, export_filename
+from .models import Address, DailyStat, DataExport
+from .idempotency import IdempotentPostMixin
+from .throttling import IPTokenBucketThrottle, EmailTokenBucketThrottle
 
 User = get_user_model()
 
 # ---------------------------
 # User Registration
 # ---------------------------
-class RegisterView(generics.CreateAPIView):
+class RegisterView(IdempotentPostMixin, generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "register"
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
+        return Response(self._with_tokens(user), status=status.HTTP_201_CREATED)
+
+    def idempotency_data(self, response):
+        # Never cache live tokens: a replay mints fresh ones for the user
+        if response.status_code == status.HTTP_201_CREATED:
+            return {"user": response.data["user"]}
+        return response.data
+
+    def replay_data(self, status_code, data):
+        if status_code != status.HTTP_201_CREATED:
+            return data
+        user = User.objects.filter(pk=data["user"]["id"], is_active=True).first()
+        # Deleted or deactivated since: replay the outcome without tokens
+        return self._with_tokens(user) if user is not None else data
+
+    def _with_tokens(self, user):
         refresh = RefreshToken.for_user(user)
-        return Response(
-            {
-                "user": UserProfileSerializer(user).data,
-                "refresh": str(refresh),
-                "access": str(refresh.access_token),
-            },
-            status=status.HTTP_201_CREATED,
-        )
+        return {
+            "user": UserProfileSerializer(user).data,
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+        }
 
 # ---------------------------
 # JWT Login & Refresh
@@ -49,8 +74,11 @@ class RegisterView(generics.CreateAPIView):
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "login"
 
 class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = RotatingTokenRefreshSerializer
     permission_classes = [permissions.AllowAny]
 
 # ---------------------------
@@ -60,11 +88,11 @@ class ProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        serializer = UserProfileSerializer(request.user)
+        serializer = UserProfileSerializer(request.user, context={"request": request})
         return Response(serializer.data)
 
     def put(self, request):
-        serializer = UserProfileSerializer(request.user, data=request.data, partial=True)
+        serializer = UserProfileSerializer(request.user, data=request.data, partial=True, context={"request": request})
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data)
@@ -74,6 +102,8 @@ class ProfileView(APIView):
 # ---------------------------
 class PasswordResetRequestView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "password_reset"
 
     def post(self, request):
         serializer = PasswordResetRequestSerializer(data=request.data)
@@ -81,19 +111,23 @@ class PasswordResetRequestView(APIView):
         email = serializer.validated_data["email"]
         user = User.objects.filter(email=email).first()
         if user:
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            token = default_token_generator.make_token(user)
-            reset_link = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}/"
-
-            # Send email (consider async for production)
-            send_mail(
-                subject="Password Reset",
-                message=f"Click to reset your password: {reset_link}",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-            )
+            send_password_reset_email(user)
         return Response({"detail": "If the email exists, a reset link has been sent."}, status=status.HTTP_200_OK)
 
+
+def send_password_reset_email(user):
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    reset_link = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}/"
+
+    # Send email (consider async for production)
+    send_mail(
+        subject="Password Reset",
+        message=f"Click to reset your password: {reset_link}",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[user.email],
+    )
+
 # ---------------------------
 # Password Reset Confirm
 # ---------------------------
@@ -109,12 +143,12 @@ class PasswordResetConfirmView(APIView):
 # ---------------------------
 # Address CRUD
 # ---------------------------
-class AddressListCreateView(generics.ListCreateAPIView):
+class AddressListCreateView(IdempotentPostMixin, generics.ListCreateAPIView):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Address.objects.filter(user=self.request.user)
+        return _address_queryset(self)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -124,4 +158,122 @@ class AddressRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Address.objects.filter(user=self.request.user)
+        return _address_queryset(self)
+
+
+def _address_queryset(view):
+    queryset = Address.objects.filter(user=view.request.user)
+    if view.request.method == "GET":
+        # Reads fetch only what ?fields=/?omit= asks for; writes load the full
+        # row so validation and save() never hit deferred fields.
+        queryset = view.get_serializer().narrow_queryset(queryset)
+    return queryset
+
+class AddressBatchView(APIView):
+    """Create, update and delete many addresses in one request and one transaction"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        try:
+            with transaction.atomic():
+                serializer = AddressBatchSerializer(data=request.data, context={"request": request})
+                serializer.is_valid(raise_exception=True)
+                result = serializer.save()
+        except IntegrityError:
+            return Response(
+                {"detail": "The batch conflicts with concurrent changes to your addresses. Please retry."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        context = {"request": request}
+        return Response(
+            {
+                "created": AddressSerializer(result["created"], many=True, context=context).data,
+                "updated": AddressSerializer(result["updated"], many=True, context=context).data,
+                "deleted": result["deleted"],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+# ---------------------------
+# Dashboard Stats (staff)
+# ---------------------------
+class DailyStatListView(generics.ListAPIView):
+    """
+    Precomputed daily signups and new addresses by country, from
+    the ``rollup_stats`` tables. Filter with ?day__gte=, ?day__lte= and
+    ?country=.
+    """
+    queryset = DailyStat.objects.all()
+    serializer_class = DailyStatSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filterset_fields = {"day": ["gte", "lte"], "country": ["exact"]}
+
+
+# ---------------------------
+# Personal Data Export
+# ---------------------------
+class DataExportView(APIView):
+    """
+    Download my data. GET streams the ZIP as it is generated; accounts with
+    more than ``EXPORT_INLINE_MAX_ADDRESSES`` addresses get their export job
+    in progress instead (202), or a 404 if there is none. POST starts a
+    background job to poll (reusing one already in progress), so crawlers
+    and prefetchers following the GET never start one.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        limit = settings.EXPORT_INLINE_MAX_ADDRESSES
+        # Counts at most limit + 1 rows, however many the user has
+        if Address.objects.filter(user=request.user)[:limit + 1].count() <= limit:
+            response = StreamingHttpResponse(export_archive(request.user), content_type="application/zip")
+            response["Content-Disposition"] = f'attachment; filename="{export_filename(request.user)}"'
+            return response
+
+        job = self._active_jobs(request.user).first()
+        if job is None:
+            return Response(
+                {"detail": "Too much data to stream. POST to start a background export."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return self._accepted(request, job)
+
+    def post(self, request):
+        active = self._active_jobs(request.user)
+        job = active.first()
+        if job is None:
+            try:
+                with transaction.atomic():
+                    job = DataExport.objects.create(user=request.user)
+            except IntegrityError:
+                # A concurrent request created it (unique_active_data_export),
+                # and it may even have finished since
+                job = active.first() or DataExport.objects.create(user=request.user)
+        return self._accepted(request, job)
+
+    def _active_jobs(self, user):
+        return DataExport.objects.filter(user=user, status__in=[DataExport.Status.PENDING, DataExport.Status.RUNNING])
+
+    def _accepted(self, request, job):
+        data = DataExportSerializer(job, context={"request": request}).data
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={"Location": data["poll_url"]})
+
+
+class DataExportDetailView(generics.RetrieveAPIView):
+    serializer_class = DataExportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return DataExport.objects.filter(user=self.request.user)
+
+
+class DataExportDownloadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(DataExport, pk=pk, user=request.user)
+        if job.status != DataExport.Status.READY or not job.archive:
+            raise Http404
+        return FileResponse(job.archive.open("rb"), as_attachment=True, filename=export_filename(request.user))
@@ -0,0 +1,72 @@
+"""
+Process warm-up, so a fresh worker's first requests do not pay for lazy
+initialization.
+
+``warm_up()`` runs from ``AccountsConfig.ready()`` when ``WARM_UP_ON_READY``
+is set. It touches no database, so with gunicorn's ``preload_app`` it runs
+once in the master and every forked worker inherits the result.
+``warm_up_connections()`` opens database connections and must run after the
+fork (gunicorn.conf.py calls it from ``post_worker_init``).
+"""
+import inspect
+import logging
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.db import connections
+from django.urls import get_resolver, reverse
+from rest_framework import serializers as drf_serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import serializers
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Initialize URL resolvers, serializers, JWT handling and hashers; returns seconds taken."""
+    started = time.perf_counter()
+    _resolve_urls()
+    _build_serializers()
+    _load_jwt()
+    get_hashers()
+    elapsed = time.perf_counter() - started
+    logger.info("Warm-up finished in %.1f ms", elapsed * 1000)
+    return elapsed
+
+
+def warm_up_connections():
+    """Open a connection to every configured database (call after fork)."""
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def _resolve_urls():
+    resolver = get_resolver()
+    # Builds the reverse map and compiles every pattern
+    for name in [name for name in resolver.reverse_dict if isinstance(name, str)]:
+        try:
+            resolver.resolve(reverse(name))
+        except Exception:
+            # Patterns that need arguments are compiled by now anyway
+            pass
+
+
+def _build_serializers():
+    for serializer_class in vars(serializers).values():
+        if (
+            inspect.isclass(serializer_class)
+            and issubclass(serializer_class, drf_serializers.Serializer)
+            and serializer_class.__module__ == serializers.__name__
+        ):
+            serializer = serializer_class()
+            for field in serializer.fields.values():
+                # Error messages are lazy; rendering them loads the translation catalogs
+                for message in field.error_messages.values():
+                    str(message)
+
+
+def _load_jwt():
+    token = str(AccessToken())
+    JWTAuthentication().get_validated_token(token)
@@ -0,0 +1,243 @@
+"""
+Multiplexed API requests.
+
+``POST /api/batch/`` runs several API calls in one HTTP round trip::
+
+    {
+        "atomic": false,
+        "requests": [
+            {"method": "GET", "path": "/api/accounts/profile/"},
+            {"method": "GET", "path": "/api/accounts/addresses/?fields=id,city"},
+            {"method": "POST", "path": "/api/accounts/token/refresh/", "body": {"refresh": "..."}}
+        ]
+    }
+
+The batch request is authenticated once; every sub-request runs as the same
+user without repeating the token check and user lookup. Sub-requests are
+dispatched straight to their views (no middleware) in order, and each one
+gets its own status, headers and body in the response. With ``"atomic":
+true`` they share a single transaction: the first sub-request that fails
+(status >= 400) rolls everything back and the remaining ones are skipped.
+"""
+import io
+import json
+import logging
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, serializers, status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+BATCH_URL_NAME = "batch"
+
+# Request details that carry over from the batch request to its sub-requests
+# (host for ALLOWED_HOSTS and absolute URLs). The client address is not
+# copied: sub-requests get the batch's resolved client IP as REMOTE_ADDR.
+INHERITED_META = (
+    "SERVER_NAME",
+    "SERVER_PORT",
+    "SERVER_PROTOCOL",
+    "HTTP_HOST",
+    "HTTP_USER_AGENT",
+    "HTTP_ACCEPT_LANGUAGE",
+)
+# Authentication is shared, the body is always JSON and every sub-request is
+# throttled as the batch's client, so sub-requests may not set these themselves
+FORBIDDEN_HEADERS = {
+    "authorization", "cookie", "host", "content-type", "content-length",
+    "x-forwarded-for", "x-real-ip", "forwarded",
+}
+# Describe the sub-response body, which is inlined into the batch response
+SKIPPED_RESPONSE_HEADERS = {"content-type", "content-length", "vary"}
+
+
+# ---------------------------
+# Serializers
+# ---------------------------
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    path = serializers.CharField(max_length=2000)
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(max_length=1000), required=False)
+
+    def validate_method(self, value):
+        return value.upper()
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith("/api/"):
+            raise serializers.ValidationError("Only /api/ paths can be batched.")
+        try:
+            match = resolve(path)
+        except Resolver404:
+            # Reported as a 404 for this sub-request only
+            return value
+        if match.url_name == BATCH_URL_NAME:
+            raise serializers.ValidationError("Batch requests cannot be nested.")
+        return value
+
+    def validate_headers(self, value):
+        forbidden = sorted(name for name in value if name.lower() in FORBIDDEN_HEADERS)
+        if forbidden:
+            raise serializers.ValidationError(f"Headers not allowed in a sub-request: {', '.join(forbidden)}.")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    atomic = serializers.BooleanField(default=False)
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        limit = getattr(settings, "BATCH_MAX_REQUESTS", 20)
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} requests per batch.")
+        return value
+
+    def validate(self, attrs):
+        # A rolled-back response must not be stored and replayed for the key
+        if attrs["atomic"] and any(
+            name.lower() == "idempotency-key"
+            for item in attrs["requests"]
+            for name in item.get("headers", {})
+        ):
+            raise serializers.ValidationError(
+                {"requests": "Idempotency-Key cannot be used in an atomic batch."}
+            )
+        return attrs
+
+
+# ---------------------------
+# View
+# ---------------------------
+class BatchView(APIView):
+    """Run several API requests in one round trip (see module docstring)."""
+
+    # Each sub-request checks its own view's permissions
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        atomic = serializer.validated_data["atomic"]
+        items = serializer.validated_data["requests"]
+
+        # Resolve the user once; sub-requests reuse it
+        user, auth = request.user, request.auth
+
+        if atomic:
+            with transaction.atomic():
+                responses = self._run_all(request, items, user, auth, stop_on_error=True)
+                rolled_back = any(item["status"] >= 400 for item in responses)
+                if rolled_back:
+                    transaction.set_rollback(True)
+        else:
+            responses = self._run_all(request, items, user, auth, stop_on_error=False)
+            rolled_back = False
+
+        return Response({"atomic": atomic, "rolled_back": rolled_back, "responses": responses})
+
+    def _run_all(self, request, items, user, auth, stop_on_error):
+        responses = []
+        for index, item in enumerate(items):
+            result = self._run(request, item, user, auth)
+            responses.append(result)
+            if stop_on_error and result["status"] >= 400:
+                skipped = {
+                    "status": status.HTTP_424_FAILED_DEPENDENCY,
+                    "headers": {},
+                    "body": {"detail": f"Not run: request {index} failed."},
+                }
+                responses.extend(dict(skipped) for _ in items[index + 1:])
+                break
+        return responses
+
+    def _run(self, request, item, user, auth):
+        path, _, query = item["path"].partition("?")
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return {"status": status.HTTP_404_NOT_FOUND, "headers": {}, "body": {"detail": "Not found."}}
+
+        sub_request = _build_sub_request(request, item, path, query, user, auth)
+        try:
+            if iscoroutinefunction(match.func):
+                response = async_to_sync(match.func)(sub_request, *match.args, **match.kwargs)
+            else:
+                response = match.func(sub_request, *match.args, **match.kwargs)
+        except Exception:
+            # API views handle their own errors; this is a plain Django view failing
+            logger.exception("Unhandled exception in batch sub-request", extra={"path": path, "method": item["method"]})
+            return {
+                "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "headers": {},
+                "body": {"detail": "An unexpected error occurred."},
+            }
+
+        return _serialize_response(response)
+
+
+def _build_sub_request(request, item, path, query, user, auth):
+    body = b""
+    if item["method"] != "GET" and "body" in item:
+        body = json.dumps(item["body"], cls=JSONEncoder).encode()
+
+    environ = {key: request.META[key] for key in INHERITED_META if key in request.META}
+    environ.update(
+        {
+            # Resolved once (trusted proxy hops only), so each sub-request is
+            # charged to the same per-IP throttle buckets as the batch itself
+            "REMOTE_ADDR": BaseThrottle().get_ident(request),
+            "REQUEST_METHOD": item["method"],
+            "PATH_INFO": path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.url_scheme": request.scheme,
+        }
+    )
+    for name, value in item.get("headers", {}).items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+
+    sub_request = WSGIRequest(environ)
+    if user is not None and user.is_authenticated:
+        # DRF's forced authentication: the sub-request's view skips its
+        # authenticators and uses the already authenticated user and token
+        sub_request._force_auth_user = user
+        sub_request._force_auth_token = auth
+    return sub_request
+
+
+def _serialize_response(response):
+    headers = {
+        name: value for name, value in response.items()
+        if name.lower() not in SKIPPED_RESPONSE_HEADERS
+    }
+
+    if response.streaming:
+        response.close()
+        return {
+            "status": status.HTTP_400_BAD_REQUEST,
+            "headers": {},
+            "body": {"detail": "Streaming responses cannot be batched."},
+        }
+
+    if hasattr(response, "data"):
+        # DRF response: use the data as is instead of rendering and re-parsing it
+        body = response.data
+    elif response.get("Content-Type", "").startswith("application/json"):
+        body = json.loads(response.content or b"null")
+    else:
+        body = response.content.decode(response.charset, errors="replace")
+
+    return {"status": response.status_code, "headers": headers, "body": body}
@@ -0,0 +1,153 @@
+"""
+Content-negotiated compression for API JSON responses.
+
+Only ``application/json`` responses under ``COMPRESSION_PATH_PREFIX`` of at
+least ``COMPRESSION_MIN_SIZE`` bytes are compressed; smaller bodies (the
+health check, most error envelopes) skip the work entirely. Brotli is used
+when the client prefers it and the optional ``brotli`` package is installed,
+gzip otherwise. Streaming responses are compressed chunk by chunk, flushing
+after each one so clients still receive data progressively.
+
+As in Django's GZipMiddleware, strong ETags are weakened (the encoded bytes
+differ from the identity representation) and gzip output is padded with a
+random-length header to blunt BREACH-style length attacks.
+"""
+import re
+import secrets
+from gzip import GzipFile
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import StreamingBuffer, compress_string
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+# Fast enough for dynamic responses; brotli's default (11) is meant for static assets
+BROTLI_QUALITY = 4
+
+_coding = re.compile(r"^\s*([A-Za-z0-9*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?")
+
+
+def negotiate(accept_encoding):
+    """The coding to use for an Accept-Encoding value ("br", "gzip" or None)."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        match = _coding.match(part)
+        if match:
+            try:
+                weights[match.group(1).lower()] = float(match.group(2) or 1)
+            except ValueError:
+                continue
+
+    wildcard = weights.get("*", 0)
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = max(supported, key=lambda coding: weights.get(coding, wildcard))
+    return best if weights.get(best, wildcard) > 0 else None
+
+
+class APICompressionMiddleware(MiddlewareMixin):
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        if not request.path.startswith(getattr(settings, "COMPRESSION_PATH_PREFIX", "/api/")):
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+        if not response.get("Content-Type", "").startswith("application/json"):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, "COMPRESSION_MIN_SIZE", 1024):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        coding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self._compress_stream(response, coding)
+            # The compressed size is unknown until the stream ends
+            del response.headers["Content-Length"]
+        else:
+            compressed = self._compress(response.content, coding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = coding
+        return response
+
+    def _compress(self, content, coding):
+        if coding == "br":
+            return brotli.compress(content, quality=BROTLI_QUALITY)
+        return compress_string(content, max_random_bytes=self.max_random_bytes)
+
+    def _compress_stream(self, response, coding):
+        content = response.streaming_content
+        if response.is_async:
+            return self._compress_async_stream(content, coding)
+        if coding == "br":
+            return self._brotli_sequence(content)
+        return self._gzip_sequence(content)
+
+    def _brotli_sequence(self, chunks):
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    def _gzip_sequence(self, chunks):
+        buffer, compressor = self._gzip_compressor()
+        with compressor:
+            for chunk in chunks:
+                data = self._gzip_chunk(buffer, compressor, chunk)
+                if data:
+                    yield data
+        yield buffer.read()
+
+    def _gzip_compressor(self):
+        """
+        One gzip member for the whole response, with the random-length
+        header of Django's compress_sequence.
+        """
+        buffer = StreamingBuffer()
+        compressor = GzipFile(
+            filename=b"a" * secrets.randbelow(self.max_random_bytes),
+            mode="wb",
+            compresslevel=6,
+            fileobj=buffer,
+            mtime=0,
+        )
+        return buffer, compressor
+
+    def _gzip_chunk(self, buffer, compressor, chunk):
+        compressor.write(chunk)
+        # Z_SYNC_FLUSH: everything so far can be decoded without ending the member
+        compressor.flush()
+        return buffer.read()
+
+    async def _compress_async_stream(self, chunks, coding):
+        if coding == "br":
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            async for chunk in chunks:
+                data = compressor.process(chunk) + compressor.flush()
+                if data:
+                    yield data
+            yield compressor.finish()
+        else:
+            buffer, compressor = self._gzip_compressor()
+            with compressor:
+                async for chunk in chunks:
+                    data = self._gzip_chunk(buffer, compressor, chunk)
+                    if data:
+                        yield data
+            yield buffer.read()
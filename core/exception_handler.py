@@ -1,3 +1,4 @@
+import inspect
 import logging
 
 from django.conf import settings
@@ -70,7 +71,12 @@ def custom_exception_handler(exc, context):
 
     # Unhandled exceptions (500)
     
-    logger.exception("Unhandled exception occurred", exc_info=exc)
+    # Rate-limited per (type, view, path) and written off-thread, see core.logs
+    logger.exception(
+        "Unhandled exception occurred",
+        exc_info=exc,
+        extra=request_context(request, view),
+    )
 
     return _error_response(
         message="An unexpected error occurred.",
@@ -97,6 +103,8 @@ def _format_drf_error_response(response, exc, request=None, view=None):
             "meta": _build_meta(request, response.status_code, view),
         },
         status=response.status_code,
+        # Keep headers set by DRF, e.g. Retry-After and WWW-Authenticate
+        headers=dict(response.items()),
     )
 
 
@@ -132,12 +140,23 @@ def _build_meta(request, status_code, view=None):
     """
     Build metadata section for error responses.
     """
-    meta = {
+    return {
         "status_code": status_code,
+        **request_context(request, view),
     }
 
+
+def request_context(request, view=None):
+    """
+    Path, method and view name of a request (also used by core.slow_queries).
+
+    ``view`` is a view instance, as DRF passes it, or the view callable that
+    middleware sees in ``process_view``.
+    """
+    context = {}
+
     if request:
-        meta.update(
+        context.update(
             {
                 "path": request.path,
                 "method": request.method,
@@ -145,6 +164,11 @@ def _build_meta(request, status_code, view=None):
         )
 
     if view:
-        meta["view"] = view.__class__.__name__
-
-    return meta
+        if hasattr(view, "view_class"):
+            context["view"] = view.view_class.__name__
+        elif inspect.isfunction(view):
+            context["view"] = view.__name__
+        else:
+            context["view"] = view.__class__.__name__
+
+    return context
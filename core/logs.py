@@ -0,0 +1,176 @@
+"""
+Logging plumbing configured by ``LOGGING`` in core/settings.py.
+
+Request threads only filter a record and put it on a bounded queue; a
+per-process listener thread formats it (tracebacks included) as one JSON
+object per line and does the blocking I/O. Identical errors are collapsed by
+``ErrorRateLimitFilter`` before they reach the queue, so a flood of 5xx
+responses costs each request a dict lookup rather than a formatted traceback.
+"""
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including ``extra`` fields."""
+
+    converter = time.gmtime
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = {
+                "type": record.exc_info[0].__name__,
+                "message": str(record.exc_info[1]),
+                "traceback": self.formatException(record.exc_info),
+            }
+        elif record.exc_text:
+            payload["exception"] = {"traceback": record.exc_text}
+        return json.dumps(payload, default=str)
+
+
+class _Listener(QueueListener):
+
+    def enqueue_sentinel(self):
+        # The queue may be full during a flood; wait for room rather than fail
+        self.queue.put(self._sentinel)
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Hands records to a listener thread that writes them to ``stream``
+    (stderr by default) with this handler's formatter.
+
+    ``emit`` never blocks: when the queue is full the record is dropped and
+    counted, and the count is attached to the next record that gets through.
+    The listener is (re)started lazily per process, so the handler survives
+    gunicorn forking workers after settings are loaded.
+    """
+
+    def __init__(self, maxsize=10000, stream=None):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.target = logging.StreamHandler(stream)
+        self.listener = None
+        self.dropped = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, in the target handler
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Unlike QueueHandler.prepare, keep exc_info: the traceback is
+        # formatted by the listener, off the request thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start_listener()
+        dropped = self.dropped
+        if dropped:
+            record.dropped_before = dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.dropped -= dropped
+
+    def _start_listener(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked: the parent's queue may hold records and locks owned
+                # by a thread that does not exist here
+                self.queue = queue.Queue(self.maxsize)
+            self.listener = _Listener(self.queue, self.target, respect_handler_level=False)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def close(self):
+        """Drain the queue and stop the listener."""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self._pid = None
+        self.target.flush()
+        super().close()
+
+
+class ErrorRateLimitFilter(logging.Filter):
+    """
+    Let the first ERROR (or worse) for a ``(type, view, path)`` through per
+    ``window`` seconds and count the rest.
+
+    ``type`` is the exception class, or ``HTTP <status>`` for Django's
+    response logging. The next record let through for a key carries
+    ``suppressed``: how many identical errors were dropped since the last one.
+    """
+
+    def __init__(self, window=60, max_keys=1000):
+        super().__init__()
+        self.window = window
+        self.max_keys = max_keys
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.ERROR:
+            return True
+
+        key = self._key(record)
+        now = time.monotonic()
+        with self._lock:
+            window_start, suppressed = self._seen.get(key, (None, 0))
+            if window_start is not None and now - window_start < self.window:
+                self._seen[key] = (window_start, suppressed + 1)
+                return False
+            if len(self._seen) >= self.max_keys:
+                self._prune(now)
+            self._seen[key] = (now, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _key(self, record):
+        if record.exc_info:
+            error_type = record.exc_info[0].__name__
+        else:
+            error_type = f"HTTP {getattr(record, 'status_code', '-')}"
+        path = getattr(record, "path", None)
+        if path is None:
+            path = getattr(getattr(record, "request", None), "path", None)
+        return error_type, getattr(record, "view", None), path
+
+    def _prune(self, now):
+        expired = [key for key, (start, _) in self._seen.items() if now - start >= self.window]
+        for key in expired:
+            del self._seen[key]
+        if len(self._seen) >= self.max_keys:
+            # Still full of live keys: forget the oldest windows
+            for key, _ in sorted(self._seen.items(), key=lambda item: item[1][0])[: self.max_keys // 10 or 1]:
+                del self._seen[key]
@@ -0,0 +1,242 @@
+"""
+Opt-in per-request memory profiling.
+
+A request is profiled when it sends ``X-Memory-Profile: <MEMORY_PROFILE_TOKEN>``
+or is picked by ``MEMORY_PROFILE_SAMPLE_RATE``. tracemalloc runs for the whole
+request, including DRF rendering (serializer ``.data``) and, for streaming
+responses such as exports, until the stream is exhausted or the response is
+closed. The peak, the memory
+still held afterwards and the top allocation sites are logged and kept in a
+bounded per-process store that staff can read at /api/memory-profiles/.
+
+tracemalloc is process-wide and slows allocation-heavy code several times
+over, so only one request per process is profiled at a time and nothing is
+traced when the feature is not triggered.
+"""
+import logging
+import random
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .exception_handler import request_context
+
+logger = logging.getLogger(__name__)
+
+memory_profiles = deque(maxlen=getattr(settings, "MEMORY_PROFILE_BUFFER_SIZE", 100))
+
+# Frames kept per allocation, enough to get from DRF, Django or the json
+# module back out through the middleware stack to application code
+TRACEBACK_FRAMES = 64
+
+_APP_ROOT = str(Path(settings.BASE_DIR).resolve())
+# Instrumentation middleware frames sit on every request's stack; skip them
+_SKIPPED_FILES = {
+    str(Path(__file__).resolve()),
+    str(Path(__file__).with_name("slow_queries.py").resolve()),
+}
+_profiling = threading.Lock()
+
+
+class MemoryProfileMiddleware:
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._requested(request) or not self._start():
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self._stop()
+            raise
+        return self._attach(request, response, started)
+
+    async def __acall__(self, request):
+        if not self._requested(request) or not self._start():
+            return await self.get_response(request)
+
+        # tracemalloc is process-wide: under ASGI, other requests served on
+        # the event loop meanwhile are counted too
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            self._stop()
+            raise
+        return self._attach(request, response, started)
+
+    def _attach(self, request, response, started):
+        """Finish now, or once a streaming response is consumed or closed."""
+        if not response.streaming:
+            self._finish(request, response, started)
+            return response
+
+        finish = _once(lambda: self._finish(request, response, started))
+        # close() runs even when the stream is never iterated (client gone,
+        # HEAD request, an error before the first chunk)
+        response._resource_closers.append(finish)
+        if response.is_async:
+            response.streaming_content = self._profile_async_stream(response.streaming_content, finish)
+        else:
+            response.streaming_content = self._profile_stream(response.streaming_content, finish)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._memory_profile_view = view_func
+
+    def _requested(self, request):
+        token = getattr(settings, "MEMORY_PROFILE_TOKEN", None)
+        header = request.headers.get("X-Memory-Profile")
+        if token and header and constant_time_compare(header, token):
+            return True
+        return random.random() < getattr(settings, "MEMORY_PROFILE_SAMPLE_RATE", 0)
+
+    def _start(self):
+        if not _profiling.acquire(blocking=False):
+            return False
+        if tracemalloc.is_tracing():
+            # Someone else (a test, the bench command) owns tracemalloc
+            _profiling.release()
+            return False
+        tracemalloc.start(TRACEBACK_FRAMES)
+        return True
+
+    def _stop(self):
+        tracemalloc.stop()
+        _profiling.release()
+
+    def _profile_stream(self, content, finish):
+        try:
+            yield from content
+        finally:
+            finish()
+
+    async def _profile_async_stream(self, content, finish):
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            finish()
+
+    def _finish(self, request, response, started):
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            self._stop()
+
+        entry = {
+            "at": timezone.now().isoformat(),
+            **request_context(request, getattr(request, "_memory_profile_view", None)),
+            "status_code": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "retained_kb": round(current / 1024, 1),
+            "top": _top_sites(snapshot, getattr(settings, "MEMORY_PROFILE_TOP_SITES", 10)),
+        }
+        memory_profiles.append(entry)
+        logger.info(
+            "Memory profile %s %s (%s): peak %.1f KB, retained %.1f KB, top site %s",
+            entry["method"],
+            entry["path"],
+            entry.get("view", "-"),
+            entry["peak_kb"],
+            entry["retained_kb"],
+            entry["top"][0]["site"] if entry["top"] else "-",
+            extra={"memory_profile": entry},
+        )
+        if not response.streaming:
+            response["X-Memory-Peak-KB"] = str(entry["peak_kb"])
+
+
+def _once(func):
+    """``func`` wrapped to run on the first call only."""
+    called = False
+
+    def wrapper():
+        nonlocal called
+        if not called:
+            called = True
+            func()
+
+    return wrapper
+
+
+def _top_sites(snapshot, limit):
+    """
+    Live allocations grouped by the innermost application frame (``site``) and
+    the line that actually allocated (``allocated_in``), largest first.
+    """
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        # Lazy imports on first use are not a per-request cost
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ])
+    sizes = defaultdict(lambda: [0, 0])
+    for stat in snapshot.statistics("traceback"):
+        frames = list(reversed(stat.traceback))
+        app_frame = next((frame for frame in frames if _is_app_frame(frame)), None)
+        key = (_format(app_frame) if app_frame else None, _format(frames[0]))
+        sizes[key][0] += stat.size
+        sizes[key][1] += stat.count
+
+    top = sorted(sizes.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    return [
+        {
+            "site": site or allocated_in,
+            "allocated_in": allocated_in,
+            "size_kb": round(size / 1024, 1),
+            "count": count,
+        }
+        for (site, allocated_in), (size, count) in top
+    ]
+
+
+def _is_app_frame(frame):
+    return (
+        frame.filename.startswith(_APP_ROOT)
+        and frame.filename not in _SKIPPED_FILES
+        and "site-packages" not in frame.filename
+    )
+
+
+def _format(frame):
+    filename = frame.filename
+    if filename.startswith(_APP_ROOT) and "site-packages" not in filename:
+        filename = str(Path(filename).relative_to(_APP_ROOT))
+    elif "site-packages/" in filename:
+        filename = filename.split("site-packages/", 1)[1]
+    return f"{filename}:{frame.lineno}"
+
+
+class MemoryProfileListView(APIView):
+    """Recent memory profiles of this process, newest first (staff only)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        entries = list(memory_profiles)
+        entries.reverse()
+        return Response({"count": len(entries), "results": entries})
@@ -17,6 +17,14 @@ DEBUG = os.getenv("DJANGO_DEBUG", "False") == "True"
 
 ALLOWED_HOSTS = ["adfinitum-backend.onrender.com", "localhost", "127.0.0.1"]
 
+# Initialize URL resolvers, serializers, JWT and hashers when the app loads
+# (accounts.warmup); gunicorn.conf.py turns this on for web workers.
+WARM_UP_ON_READY = os.getenv("DJANGO_WARM_UP", "False") == "True"
+
+# Route profile, address and password-reset endpoints to the async views
+# (accounts.async_views); enable when serving through core.asgi.
+ASYNC_API_VIEWS = os.getenv("DJANGO_ASYNC_VIEWS", "False") == "True"
+
 
 
 # Application definition
@@ -41,6 +49,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    "core.slow_queries.SlowQueryMiddleware",
+    "core.memory_profiling.MemoryProfileMiddleware",
+    "core.compression.APICompressionMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -93,10 +104,35 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections across requests, so the one a worker opens at
+        # startup (gunicorn.conf.py) is reused rather than closed. Set
+        # DB_CONN_MAX_AGE=0 when serving through core.asgi.
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 
+# Cache
+# Set REDIS_URL so cached state (idempotency records, ...) is shared across workers.
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -158,18 +194,131 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend"
     ],
-    "EXCEPTION_HANDLER": "accounts.exception_handler.custom_exception_handler",
+    "EXCEPTION_HANDLER": "core.exception_handler.custom_exception_handler",
+    # Reverse proxies in front of the app that append to X-Forwarded-For. The
+    # client IP used by the per-IP throttles is taken that many hops from the
+    # right, so client-supplied entries are ignored; 0 means REMOTE_ADDR.
+    # Production sits behind Render's load balancer, a single hop.
+    "NUM_PROXIES": int(os.getenv("DJANGO_NUM_PROXIES", "0" if DEBUG else "1")),
+    # Token buckets for the expensive AllowAny endpoints (see accounts.throttling)
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": "30/min",
+        "login_email": "10/min",
+        "register_ip": "10/hour",
+        "register_email": "5/hour",
+        "password_reset_ip": "10/hour",
+        "password_reset_email": "3/hour",
+    },
 }
 
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
+    # Rotated tokens are revoked in accounts.RevokedToken, not the blacklist app
+    "ROTATE_REFRESH_TOKENS": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # last_login is written behind by accounts.last_login, not on each login
+    "UPDATE_LAST_LOGIN": False,
 }
 
 AUTH_USER_MODEL = "accounts.CustomUser"
 
+AUTHENTICATION_BACKENDS = ["accounts.backends.CachedPermissionBackend"]
+
+# Seconds a resolved permission set stays cached (also invalidated on change)
+PERMISSION_CACHE_TIMEOUT = 300
+
+# rollup_stats only counts rows older than this (seconds), so rows from
+# transactions still open when it runs are not skipped
+ROLLUP_SAFETY_LAG = 5 * 60
+
+
+# purge_inactive_users: deactivated accounts not seen (last login, else signup)
+# for this many days are deleted with their addresses
+INACTIVE_USER_RETENTION_DAYS = 365
+
+
+# "Download my data" (accounts.exports): users with up to this many addresses get
+# the archive streamed inline; larger exports are built by process_data_exports
+EXPORT_INLINE_MAX_ADDRESSES = 1000
+EXPORT_CHUNK_SIZE = 500
+EXPORT_ROOT = BASE_DIR / "private" / "exports"
+EXPORT_ARCHIVE_TTL = 60 * 60 * 24
+# Running jobs older than this are assumed dead and picked up again (seconds)
+EXPORT_JOB_TIMEOUT = 60 * 60
+# Jobs claimed this many times without finishing are marked failed
+EXPORT_JOB_MAX_ATTEMPTS = 3
+
+
+# Buffered last_login writes: flush every N seconds, or once this many users are pending
+LAST_LOGIN_FLUSH_INTERVAL = 30
+LAST_LOGIN_BUFFER_SIZE = 1000
+# Run the flush thread; without it, pending logins are written by explicit
+# flush() calls and at exit only
+LAST_LOGIN_FLUSH_AUTOSTART = True
+
+
+# Slow-query log (core.slow_queries): queries taking at least the threshold are
+# logged with their view and stack; a sample is kept for /api/slow-queries/
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_SAMPLE_RATE = 1.0
+SLOW_QUERY_BUFFER_SIZE = 200
+SLOW_QUERY_STACK_DEPTH = 3
+
+
+# Negotiated gzip/brotli for API JSON responses (core.compression); smaller
+# bodies are sent as-is
+COMPRESSION_PATH_PREFIX = "/api/"
+COMPRESSION_MIN_SIZE = 1024
+
+
+# Opt-in tracemalloc profiling (core.memory_profiling): a random sample of
+# requests, plus any request sending "X-Memory-Profile: <token>"
+MEMORY_PROFILE_SAMPLE_RATE = float(os.getenv("MEMORY_PROFILE_SAMPLE_RATE", "0"))
+MEMORY_PROFILE_TOKEN = os.getenv("MEMORY_PROFILE_TOKEN")
+MEMORY_PROFILE_BUFFER_SIZE = 100
+MEMORY_PROFILE_TOP_SITES = 10
+
+
+# Sub-requests allowed in one POST /api/batch/ (core.batch)
+BATCH_MAX_REQUESTS = 20
+
+
+# Idempotency-Key support for retried POSTs (seconds)
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+
+
+# Logging: JSON lines to stderr, written by a background thread (core.logs).
+# Identical errors by (type, view, path) are logged once per window and counted.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "core.logs.JsonFormatter"},
+    },
+    "filters": {
+        "rate_limit_errors": {"()": "core.logs.ErrorRateLimitFilter", "window": 60},
+    },
+    "handlers": {
+        "background": {
+            "class": "core.logs.BackgroundHandler",
+            "formatter": "json",
+            "filters": ["rate_limit_errors"],
+            "maxsize": 10000,
+        },
+    },
+    "root": {
+        "handlers": ["background"],
+        "level": os.getenv("DJANGO_LOG_LEVEL", "INFO"),
+    },
+    "loggers": {
+        # 4xx responses are logged at WARNING; only server errors are worth a line
+        "django.request": {"level": "ERROR"},
+    },
+}
+
 
 # Example using console backend for dev
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -0,0 +1,167 @@
+"""
+Slow-query log.
+
+Every database connection gets an execute wrapper that times each query.
+Queries at or above ``SLOW_QUERY_THRESHOLD_MS`` are logged with their SQL,
+the shape of their parameters (never the values: they include emails and
+password hashes), the view that issued them and the innermost application
+stack frames. A sample (``SLOW_QUERY_SAMPLE_RATE``) is kept in a bounded,
+per-process ring buffer that staff can read at /api/slow-queries/.
+"""
+import logging
+import random
+import sys
+import time
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .exception_handler import request_context
+
+logger = logging.getLogger(__name__)
+
+_current_request = ContextVar("slow_query_request", default=None)
+
+slow_queries = deque(maxlen=getattr(settings, "SLOW_QUERY_BUFFER_SIZE", 200))
+
+_APP_ROOT = str(Path(settings.BASE_DIR).resolve())
+# Instrumentation middleware frames sit on every request's stack; skip them
+_SKIPPED_FILES = {
+    str(Path(__file__).resolve()),
+    str(Path(__file__).with_name("memory_profiling.py").resolve()),
+}
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    # Taken up front: executemany() may be handed a one-shot iterator
+    shape = _params_shape(params, many)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 200):
+            _record(sql, shape, duration_ms, context["connection"].alias)
+
+
+def _record(sql, shape, duration_ms, alias):
+    entry = {
+        "at": timezone.now().isoformat(),
+        "duration_ms": round(duration_ms, 1),
+        "alias": alias,
+        "sql": sql,
+        "params": shape,
+        "stack": _app_frames(getattr(settings, "SLOW_QUERY_STACK_DEPTH", 3)),
+        **(_current_request.get() or {}),
+    }
+    logger.warning(
+        "Slow query (%.1f ms) in %s at %s: %s [params: %s]",
+        entry["duration_ms"],
+        entry.get("view", "-"),
+        entry["stack"][0] if entry["stack"] else "-",
+        sql,
+        entry["params"],
+        extra={"slow_query": entry},
+    )
+    if random.random() < getattr(settings, "SLOW_QUERY_SAMPLE_RATE", 1.0):
+        slow_queries.append(entry)
+
+
+def _params_shape(params, many):
+    if params is None:
+        return "none"
+    if many:
+        # Counting an iterator would consume the rows before the driver sees them
+        if not isinstance(params, (list, tuple)):
+            return "iterator rows"
+        width = len(params[0]) if params else 0
+        return f"{len(params)} rows x {width}"
+    if isinstance(params, dict):
+        return f"{len(params)} named"
+    return f"{len(params)} positional"
+
+
+def _app_frames(depth):
+    """The innermost ``depth`` frames from application code, innermost first."""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < depth:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(_APP_ROOT)
+            and filename not in _SKIPPED_FILES
+            and "site-packages" not in filename
+        ):
+            frames.append(
+                f"{Path(filename).relative_to(_APP_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            )
+        frame = frame.f_back
+    return frames
+
+
+def install(connection, **kwargs):
+    """``connection_created`` receiver; also safe to call on an open connection."""
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+class SlowQueryMiddleware:
+    """
+    Installs the wrapper on database connections and records which view is
+    running, so slow queries can be attributed to it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(install, dispatch_uid="core.slow_queries.install")
+        # Connections opened before the first request (checks, migrations, tests)
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current_request.set(request_context(request))
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_request.set(request_context(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current_request.set(request_context(request, view_func))
+
+
+class SlowQueryListView(APIView):
+    """Sampled slow queries of this process, newest first (staff only)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        entries = list(slow_queries)
+        entries.reverse()
+        return Response({
+            "threshold_ms": getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 200),
+            "count": len(entries),
+            "results": entries,
+        })
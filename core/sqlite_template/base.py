@@ -0,0 +1,9 @@
+from django.db.backends.sqlite3 import base
+
+from .creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, with test databases restored from a pre-migrated template."""
+
+    creation_class = DatabaseCreation
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.db.backends.sqlite3 import creation
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """
+    Build an in-memory test database by copying a cached template instead of
+    running every migration.
+
+    The template is a migrated SQLite file in ``TEST_DB_TEMPLATE_DIR`` named
+    after a hash of the Django version and every migration file, so it is
+    rebuilt as soon as a migration is added or edited and reused otherwise.
+    File-based test databases and --keepdb take the normal path.
+    """
+
+    def create_test_db(self, verbosity=1, autoclobber=False, serialize=True, keepdb=False):
+        test_database_name = self._get_test_db_name()
+        if keepdb or not self.is_in_memory_db(test_database_name):
+            return super().create_test_db(verbosity, autoclobber, serialize, keepdb)
+
+        template = self.template_path()
+        if not template.exists():
+            self._build_template(template, verbosity)
+        if verbosity >= 1:
+            self.log(
+                f"Restoring test database for alias "
+                f"{self._get_database_display_str(verbosity, test_database_name)} from {template.name}..."
+            )
+
+        self.connection.close()
+        settings.DATABASES[self.connection.alias]["NAME"] = test_database_name
+        self.connection.settings_dict["NAME"] = test_database_name
+        self.connection.ensure_connection()
+        source = sqlite3.connect(template)
+        try:
+            source.backup(self.connection.connection)
+        finally:
+            source.close()
+
+        if serialize:
+            self.connection._test_serialized_contents = self.serialize_db_to_string()
+        call_command("createcachetable", database=self.connection.alias)
+        return test_database_name
+
+    def template_path(self):
+        digest = hashlib.sha256(django.get_version().encode())
+        for app_config in sorted(apps.get_app_configs(), key=lambda app_config: app_config.label):
+            for path in sorted((Path(app_config.path) / "migrations").glob("*.py")):
+                digest.update(f"{app_config.label}/{path.name}".encode())
+                digest.update(path.read_bytes())
+        return Path(settings.TEST_DB_TEMPLATE_DIR) / f"{self.connection.alias}-{digest.hexdigest()[:16]}.sqlite3"
+
+    def _build_template(self, template, verbosity):
+        if verbosity >= 1:
+            self.log(f"Migrating test database template {template.name}...")
+        template.parent.mkdir(parents=True, exist_ok=True)
+        # Migrate into a private file and rename it into place, so concurrent
+        # runs never see a half-migrated template.
+        building = template.with_name(f"{template.name}.{os.getpid()}.tmp")
+        building.unlink(missing_ok=True)
+
+        self.connection.close()
+        settings.DATABASES[self.connection.alias]["NAME"] = str(building)
+        self.connection.settings_dict["NAME"] = str(building)
+        try:
+            call_command(
+                "migrate",
+                verbosity=max(verbosity - 1, 0),
+                interactive=False,
+                database=self.connection.alias,
+                run_syncdb=True,
+            )
+        finally:
+            self.connection.close()
+        os.replace(building, template)
+
+        # Templates for older migration states are never used again
+        for stale in template.parent.glob(f"{self.connection.alias}-*.sqlite3"):
+            if stale != template:
+                stale.unlink(missing_ok=True)
@@ -0,0 +1,43 @@
+"""
+Settings for ``manage.py test`` (selected automatically by manage.py).
+
+In-memory SQLite restored from a cached, pre-migrated template
+(core.sqlite_template), a fast password hasher and process-local cache and
+mail, so the suite needs no services and is safe to run with --parallel.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "core.sqlite_template",
+        "NAME": ":memory:",
+    }
+}
+
+# Migrated template databases, keyed by a hash of the migrations
+TEST_DB_TEMPLATE_DIR = BASE_DIR / ".cache" / "test-db"
+
+# PBKDF2 is deliberately slow; tests only need hashes that round-trip
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# Never share state with a configured Redis: parallel workers and cache.clear()
+# in one test process must not affect another.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Data export archives (accounts.exports)
+EXPORT_ROOT = BASE_DIR / ".cache" / "test-exports"
+
+# No background flush thread racing the test database; tests flush explicitly
+LAST_LOGIN_FLUSH_AUTOSTART = False
+
+# The test client talks to the app directly, with no proxy in front
+REST_FRAMEWORK = {**REST_FRAMEWORK, "NUM_PROXIES": 0}
+
+EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+# Keep test output readable; assertLogs still sees lower levels
+LOGGING = {**LOGGING, "root": {**LOGGING["root"], "level": "ERROR"}}
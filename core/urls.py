@@ -5,6 +5,10 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import JsonResponse
 
+from .batch import BATCH_URL_NAME, BatchView
+from .memory_profiling import MemoryProfileListView
+from .slow_queries import SlowQueryListView
+
 def health_check(request):
     """Simple health check endpoint"""
     return JsonResponse({"status": "ok", "message": "Adfinitum Backend is running"})
@@ -13,6 +17,9 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/accounts/", include("accounts.urls")),
     path("api/health/", health_check, name="health-check"),
+    path("api/batch/", BatchView.as_view(), name=BATCH_URL_NAME),
+    path("api/slow-queries/", SlowQueryListView.as_view(), name="slow-queries"),
+    path("api/memory-profiles/", MemoryProfileListView.as_view(), name="memory-profiles"),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings, picked up automatically from the working directory:
+
+    gunicorn core.wsgi
+
+With preload_app (the default here) Django is loaded and warmed up once in the
+master (accounts.warmup) and forked workers start with URL resolvers,
+serializers, JWT handling and hashers already initialized. Each worker then
+opens its own database connections before taking traffic.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = 5
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+# Read by core.settings when the app is loaded
+os.environ.setdefault("DJANGO_WARM_UP", "True")
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        # Sockets must not be shared across processes; nothing should be open
+        # after warm-up, but make sure.
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    from accounts.warmup import warm_up_connections
+
+    warm_up_connections()